@@ -1,6 +1,9 @@
 from django.contrib import admin
+from django.shortcuts import render
 
-from .models import Comment, Group, Post
+from .middleware import slow_requests
+from .models import AuthorStats, Comment, Group, Post, Task
+from .search import search_posts
 
 LIST_PER_PAGE = 10
 
@@ -28,6 +31,11 @@ class PostAdmin(admin.ModelAdmin):
     list_per_page = LIST_PER_PAGE
     readonly_fields = ["image_tag"]
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return queryset.filter(pk__in=search_posts(search_term)), False
+
 
 class CommentAdmin(admin.ModelAdmin):
     """
@@ -40,6 +48,39 @@ class CommentAdmin(admin.ModelAdmin):
     list_per_page = LIST_PER_PAGE
 
 
+class AuthorStatsAdmin(admin.ModelAdmin):
+    """
+    Класс отображения счетчиков авторов в админке сайта.
+    """
+    list_display = ("user", "posts_count", "comments_count",
+                    "followers_count", "following_count")
+    search_fields = ("user__username",)
+    list_per_page = LIST_PER_PAGE
+    readonly_fields = ("user",)
+
+
+class TaskAdmin(admin.ModelAdmin):
+    """
+    Класс отображения фоновых задач в админке сайта.
+    """
+    list_display = ("pk", "name", "args", "status", "attempts", "run_at",
+                    "created")
+    list_filter = ("status", "name")
+    list_per_page = LIST_PER_PAGE
+    readonly_fields = ("locked_by", "locked_at", "last_error", "created")
+
+
+def profiling_view(request):
+    """Страница админки с самыми медленными запросами."""
+    context = dict(
+        admin.site.each_context(request),
+        title="Медленные запросы",
+        requests=slow_requests())
+    return render(request, "admin/profiling.html", context)
+
+
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Post, PostAdmin)
 admin.site.register(Comment, CommentAdmin)
+admin.site.register(AuthorStats, AuthorStatsAdmin)
+admin.site.register(Task, TaskAdmin)
@@ -0,0 +1,374 @@
+"""
+JSON API приложения posts.
+
+Списки отдаются потоком: строки выбираются через values() одним запросом
+и сериализуются по одной, без создания объектов моделей. Параметр
+?fields= задает набор полей, ?cursor= и ?limit= — страницу списка.
+"""
+import base64
+import binascii
+import json
+from functools import wraps
+
+from django.contrib.auth import authenticate
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count
+from django.http import (Http404, HttpResponse, JsonResponse,
+                         StreamingHttpResponse)
+from django.middleware.csrf import CsrfViewMiddleware
+from django.shortcuts import get_object_or_404
+from django.views.decorators.csrf import csrf_exempt
+
+from .forms import CommentForm, PostForm
+from .models import Comment, Follow, Group, Post, User, count_comments
+from .notifications import schedule_notifications
+from .pagination import CURSOR_PARAM, CursorPaginator
+from .thumbnails import schedule_thumbnail
+
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+FIELDS_PARAM = "fields"
+LIMIT_PARAM = "limit"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class ApiError(Exception):
+    """Ошибка запроса к API с кодом ответа."""
+
+    def __init__(self, status, detail):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+def image_url(name):
+    return default_storage.url(name) if name else None
+
+
+class Resource:
+    """
+    Поля ресурса API.
+
+    fields сопоставляет имя поля в ответе с выражением для values(),
+    annotations — вычисляемые поля, formatters — преобразование значений.
+    """
+
+    def __init__(self, fields, key="pk", descending=False, annotations=None,
+                 formatters=None):
+        self.fields = fields
+        self.key = key
+        self.descending = descending
+        self.annotations = annotations or {}
+        self.formatters = formatters or {}
+
+    def requested_fields(self, request):
+        """Поля из параметра ?fields=, по умолчанию все."""
+        value = request.GET.get(FIELDS_PARAM)
+        if not value:
+            return list(self.fields)
+        names = [name.strip() for name in value.split(",") if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ApiError(400, f"Неизвестные поля: {', '.join(unknown)}")
+        return names
+
+    def values(self, queryset, names):
+        """Выборка только нужных столбцов и вычисляемых полей."""
+        annotations = {
+            name: self.annotations[name]
+            for name in names if name in self.annotations}
+        lookups = {self.fields[name] for name in names}
+        lookups.update(("id", "id" if self.key == "pk" else self.key))
+        return queryset.annotate(**annotations).values(*lookups)
+
+    def serialize(self, row, names):
+        data = {}
+        for name in names:
+            value = row[self.fields[name]]
+            formatter = self.formatters.get(name)
+            data[name] = formatter(value) if formatter else value
+        return data
+
+
+POSTS = Resource(
+    fields={
+        "id": "id",
+        "text": "text",
+        "pub_date": "pub_date",
+        "author": "author__username",
+        "group": "group__slug",
+        "image": "image",
+        "comments_count": "comments_count",
+    },
+    key="pub_date",
+    descending=True,
+    annotations={
+        "comments_count": count_comments(),
+    },
+    formatters={"image": image_url})
+GROUPS = Resource(
+    fields={
+        "id": "id",
+        "title": "title",
+        "slug": "slug",
+        "description": "description",
+        "posts_count": "posts_count",
+    },
+    annotations={"posts_count": Count("group_posts")})
+COMMENTS = Resource(
+    fields={
+        "id": "id",
+        "post": "post_id",
+        "author": "author__username",
+        "text": "text",
+        "created": "created",
+    },
+    key="created")
+FOLLOWS = Resource(
+    fields={
+        "id": "id",
+        "user": "user__username",
+        "author": "author__username",
+    })
+
+
+def api_view(*methods):
+    """
+    Обертка view-функции API.
+
+    Проверяет метод запроса, принимает HTTP Basic наряду с сессией
+    (для сессии изменяющие запросы проверяются на CSRF) и отдает ошибки
+    в виде JSON.
+    """
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            try:
+                if request.method not in methods:
+                    raise ApiError(405, "Метод не поддерживается.")
+                authenticate_request(request)
+                return view(request, *args, **kwargs)
+            except Http404:
+                return error_response(404, "Не найдено.")
+            except ApiError as error:
+                response = error_response(error.status, error.detail)
+                if error.status == 401:
+                    response["WWW-Authenticate"] = 'Basic realm="api"'
+                return response
+        return wrapper
+    return decorator
+
+
+def authenticate_request(request):
+    header = request.META.get("HTTP_AUTHORIZATION", "")
+    if not header.startswith("Basic "):
+        if request.method not in SAFE_METHODS:
+            check = CsrfViewMiddleware()
+            check.process_request(request)
+            if check.process_view(request, None, (), {}) is not None:
+                raise ApiError(403, "Ошибка проверки CSRF.")
+        return
+    try:
+        credentials = base64.b64decode(header[len("Basic "):]).decode()
+        username, password = credentials.split(":", 1)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ApiError(401, "Неверный заголовок авторизации.")
+    user = authenticate(request, username=username, password=password)
+    if user is None:
+        raise ApiError(401, "Неверное имя пользователя или пароль.")
+    request.user = user
+
+
+def require_user(request):
+    if not request.user.is_authenticated:
+        raise ApiError(401, "Требуется авторизация.")
+    return request.user
+
+
+def error_response(status, detail):
+    data = {"errors" if isinstance(detail, dict) else "detail": detail}
+    return JsonResponse(
+        data, status=status, json_dumps_params={"ensure_ascii": False})
+
+
+def request_data(request):
+    """Данные запроса из JSON-тела или из формы."""
+    if request.content_type != "application/json":
+        return request.POST.dict()
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        raise ApiError(400, "Некорректный JSON.")
+    if not isinstance(data, dict):
+        raise ApiError(400, "Ожидается JSON-объект.")
+    return data
+
+
+def page_size(request):
+    try:
+        limit = int(request.GET.get(LIMIT_PARAM, API_PAGE_SIZE))
+    except ValueError:
+        return API_PAGE_SIZE
+    return min(max(limit, 1), API_MAX_PAGE_SIZE)
+
+
+def list_response(request, queryset, resource):
+    """Потоковый ответ со страницей списка и курсором следующей."""
+    names = resource.requested_fields(request)
+    paginator = CursorPaginator(
+        resource.values(queryset, names),
+        page_size(request),
+        key=resource.key,
+        descending=resource.descending)
+    rows = paginator.iter_page(request.GET.get(CURSOR_PARAM))
+
+    def chunks():
+        yield '{"results": ['
+        separator = ""
+        while True:
+            try:
+                row = next(rows)
+            except StopIteration as stop:
+                next_cursor = stop.value
+                break
+            yield separator + json.dumps(
+                resource.serialize(row, names), cls=DjangoJSONEncoder,
+                ensure_ascii=False)
+            separator = ", "
+        yield f'], "next": {json.dumps(next_cursor)}}}'
+
+    return StreamingHttpResponse(chunks(), content_type="application/json")
+
+
+def detail_response(request, queryset, resource, status=200):
+    names = resource.requested_fields(request)
+    row = resource.values(queryset.order_by("pk"), names).first()
+    if row is None:
+        raise Http404
+    return JsonResponse(
+        resource.serialize(row, names), status=status,
+        json_dumps_params={"ensure_ascii": False})
+
+
+def form_data(data, instance=None):
+    """Данные для PostForm: группа передается в API по slug."""
+    values = {}
+    if instance is not None:
+        values = {"text": instance.text, "group": instance.group_id}
+    values.update(data)
+    slug = data.get("group")
+    if slug:
+        group_id = Group.objects.filter(slug=slug).values_list(
+            "pk", flat=True).first()
+        if group_id is None:
+            raise ApiError(400, {"group": [f"Группа {slug} не найдена."]})
+        values["group"] = group_id
+    return values
+
+
+@api_view("GET", "POST")
+def posts_list(request):
+    """Список публикаций с фильтрами ?author= и ?group=; создание поста."""
+    if request.method == "POST":
+        form = PostForm(
+            form_data(request_data(request)), files=request.FILES or None)
+        if not form.is_valid():
+            raise ApiError(400, form.errors.get_json_data())
+        post = form.save(commit=False)
+        post.author = require_user(request)
+        post.save()
+        schedule_notifications(post)
+        if post.image:
+            schedule_thumbnail(post.pk)
+        return detail_response(
+            request, Post.objects.filter(pk=post.pk), POSTS, status=201)
+    posts = Post.objects.all()
+    if request.GET.get("author"):
+        posts = posts.filter(author__username=request.GET["author"])
+    if request.GET.get("group"):
+        posts = posts.filter(group__slug=request.GET["group"])
+    return list_response(request, posts, POSTS)
+
+
+@api_view("GET", "PATCH", "DELETE")
+def post_detail(request, post_id):
+    """Публикация; изменять и удалять ее может только автор."""
+    if request.method == "GET":
+        return detail_response(request, Post.objects.filter(pk=post_id), POSTS)
+    post = get_object_or_404(Post, pk=post_id)
+    if post.author_id != require_user(request).pk:
+        raise ApiError(403, "Изменять публикацию может только автор.")
+    if request.method == "DELETE":
+        post.delete()
+        return HttpResponse(status=204)
+    form = PostForm(
+        form_data(request_data(request), post), files=request.FILES or None,
+        instance=post)
+    if not form.is_valid():
+        raise ApiError(400, form.errors.get_json_data())
+    post = form.save()
+    if "image" in form.changed_data and post.image:
+        schedule_thumbnail(post.pk)
+    return detail_response(request, Post.objects.filter(pk=post.pk), POSTS)
+
+
+@api_view("GET", "POST")
+def comments_list(request, post_id):
+    """Комментарии к публикации от старых к новым; новый комментарий."""
+    if request.method == "POST":
+        user = require_user(request)
+        post = get_object_or_404(Post, pk=post_id)
+        form = CommentForm(request_data(request))
+        if not form.is_valid():
+            raise ApiError(400, form.errors.get_json_data())
+        comment = form.save(commit=False)
+        comment.post = post
+        comment.author = user
+        comment.save()
+        return detail_response(
+            request, Comment.objects.filter(pk=comment.pk), COMMENTS,
+            status=201)
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    return list_response(
+        request, Comment.objects.filter(post_id=post_id), COMMENTS)
+
+
+@api_view("GET")
+def groups_list(request):
+    """Список групп."""
+    return list_response(request, Group.objects.all(), GROUPS)
+
+
+@api_view("GET")
+def group_detail(request, slug):
+    """Группа по slug."""
+    return detail_response(request, Group.objects.filter(slug=slug), GROUPS)
+
+
+@api_view("GET", "POST")
+def follows_list(request):
+    """Подписки текущего пользователя; подписка на автора."""
+    user = require_user(request)
+    if request.method == "POST":
+        username = request_data(request).get("author")
+        author = get_object_or_404(User, username=username or "")
+        if author == user:
+            raise ApiError(400, "Нельзя подписаться на самого себя.")
+        follow, _ = Follow.objects.get_or_create(author=author, user=user)
+        return detail_response(
+            request, Follow.objects.filter(pk=follow.pk), FOLLOWS,
+            status=201)
+    return list_response(request, Follow.objects.filter(user=user), FOLLOWS)
+
+
+@api_view("DELETE")
+def follow_detail(request, username):
+    """Отписка текущего пользователя от автора."""
+    deleted, _ = Follow.objects.filter(
+        user=require_user(request), author__username=username).delete()
+    if not deleted:
+        raise Http404
+    return HttpResponse(status=204)
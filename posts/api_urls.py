@@ -0,0 +1,16 @@
+from django.urls import path
+
+from . import api
+
+app_name = "api"
+
+urlpatterns = [
+    path("posts/", api.posts_list, name="posts"),
+    path("posts/<int:post_id>/", api.post_detail, name="post"),
+    path("posts/<int:post_id>/comments/", api.comments_list,
+         name="comments"),
+    path("groups/", api.groups_list, name="groups"),
+    path("groups/<slug:slug>/", api.group_detail, name="group"),
+    path("follows/", api.follows_list, name="follows"),
+    path("follows/<str:username>/", api.follow_detail, name="follow"),
+]
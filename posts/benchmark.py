@@ -0,0 +1,209 @@
+"""
+Нагрузочный замер страниц приложения posts.
+
+Заполняет базу синтетическими данными, запрашивает каждый маршрут
+из posts/urls.py и сравнивает число запросов к базе, задержку и размер
+ответа с сохраненным эталоном.
+"""
+import json
+import math
+import threading
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db import OperationalError, connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+
+from .models import Comment, Post, User
+from .seed import generate, rebuild_derived
+from .urls import urlpatterns
+
+DATASET = {
+    "users": 200,
+    "groups": 20,
+    "posts": 5000,
+    "comments": 10000,
+    "follows": 2000,
+}
+AUTHOR_ROUTES = ("new_post", "post_edit")
+QUERY_STRINGS = {"search": "?q=пост"}
+TOLERANCES = {
+    "queries": 1,
+    "bytes": 1.1,
+    "p95_ms": 2,
+}
+# Настройки SQLite по умолчанию, с которыми сравниваются SQLITE_PRAGMAS
+DEFAULT_SQLITE_PRAGMAS = {
+    "journal_mode": "delete",
+    "synchronous": "full",
+    "mmap_size": 0,
+    "cache_size": -2000,
+    "temp_store": "default",
+}
+
+
+def seed_dataset(users, groups, posts, comments, follows, seed=0):
+    """Создает синтетические данные и пересчитывает производные таблицы."""
+    generate(users, groups, posts, comments, follows, seed=seed,
+             prefix="bench")
+    rebuild_derived()
+
+
+def route_urls(post):
+    """Адреса всех именованных маршрутов posts для данного поста."""
+    values = {
+        "username": post.author.username,
+        "post_id": post.pk,
+        "slug": post.group.slug,
+    }
+    for pattern in urlpatterns:
+        if not isinstance(pattern, URLPattern) or not pattern.name:
+            continue
+        kwargs = {name: values[name] for name in pattern.pattern.converters}
+        url = reverse(pattern.name, kwargs=kwargs)
+        yield pattern.name, url + QUERY_STRINGS.get(pattern.name, "")
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(len(ordered) * percent / 100) - 1)]
+
+
+def measure(client, url, requests):
+    """Замеры одного адреса: запросы к базе, задержка и размер ответа."""
+    cache.clear()
+    connection.queries_log.clear()
+    timings = []
+    queries = size = status = 0
+    for _ in range(requests):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries = max(queries, len(captured))
+        size = max(size, len(response.content))
+        status = response.status_code
+    return {
+        "status": status,
+        "queries": queries,
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p95_ms": round(percentile(timings, 95), 3),
+        "bytes": size,
+    }
+
+
+def run(requests=20):
+    """
+    Замеряет все маршруты posts.
+
+    Страницы автора открываются от имени автора поста, остальные — от
+    имени его подписчика.
+    """
+    post = Post.objects.select_related("author", "group").filter(
+        group__isnull=False, author__following__isnull=False).first()
+    reader = Client()
+    reader.force_login(post.author.following.exclude(user=None).first().user)
+    author = Client()
+    author.force_login(post.author)
+    results = {}
+    for name, url in route_urls(post):
+        client = author if name in AUTHOR_ROUTES else reader
+        results[name] = measure(client, url, requests)
+    return results
+
+
+def compare(results, baseline, checks=tuple(TOLERANCES)):
+    """Список превышений эталона; пустой, если все в норме."""
+    failures = []
+    for name, metrics in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        for check in checks:
+            if metrics[check] > expected[check] * TOLERANCES[check]:
+                failures.append(
+                    f"{name}: {check} = {metrics[check]}, "
+                    f"эталон {expected[check]}")
+    return failures
+
+
+def load_baseline(path):
+    with open(path, encoding="utf-8") as baseline_file:
+        return json.load(baseline_file)
+
+
+def save_baseline(path, results):
+    with open(path, "w", encoding="utf-8") as baseline_file:
+        json.dump(results, baseline_file, ensure_ascii=False, indent=4,
+                  sort_keys=True)
+        baseline_file.write("\n")
+
+
+def write_worker(user_id, post_id, writes, results):
+    """Поток записи: каждая пятая запись — пост, остальные — комментарии."""
+    written = errors = 0
+    try:
+        for i in range(writes):
+            try:
+                if i % 5 == 0:
+                    Post.objects.create(
+                        text=f"Пост {i}", author_id=user_id)
+                else:
+                    Comment.objects.create(
+                        text=f"Комментарий {i}", author_id=user_id,
+                        post_id=post_id)
+                written += 1
+            except OperationalError:
+                errors += 1
+    finally:
+        connection.close()
+    results.append((written, errors))
+
+
+def run_writes(threads, writes, pragmas):
+    """
+    Замер пропускной способности параллельной записи.
+
+    Каждый поток работает в своем соединении, открытом с заданными
+    PRAGMA; ошибки "database is locked" считаются отдельно.
+    """
+    with override_settings(SQLITE_PRAGMAS=pragmas):
+        connection.close()
+        connection.ensure_connection()
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            journal_mode = cursor.fetchone()[0]
+        users = User.objects.bulk_create(
+            User(username=f"writer-{uuid.uuid4().hex}")
+            for _ in range(threads))
+        user_ids = [user.pk for user in User.objects.filter(
+            username__in=[user.username for user in users])]
+        post_ids = [
+            Post.objects.create(text="Пост", author_id=user_id).pk
+            for user_id in user_ids]
+        results = []
+        workers = [
+            threading.Thread(
+                target=write_worker,
+                args=(user_id, post_id, writes, results))
+            for user_id, post_id in zip(user_ids, post_ids)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+        connection.close()
+    written = sum(item[0] for item in results)
+    return {
+        "journal_mode": journal_mode,
+        "threads": threads,
+        "written": written,
+        "errors": sum(item[1] for item in results),
+        "seconds": round(elapsed, 3),
+        "writes_per_s": round(written / elapsed, 1),
+    }
@@ -0,0 +1,240 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+from .models import Group
+from .pagination import (CURSOR_PARAM, PAGE_PARAM, estimated_count,
+                         use_cursor)
+from .routers import primary_alias
+
+FEED_VERSION_KEY = "feed:version"
+COUNT_VERSION_KEY = "count:version"
+ALL_PAGES = "all"
+
+
+def shared_cache():
+    """
+    Общий для всех процессов уровень кэша.
+
+    Поколение лент хранится только в нем: локальная копия счетчика
+    в процессе задержала бы сброс кэша для остальных процессов.
+    """
+    return getattr(cache, "shared", cache)
+
+
+def feed_version():
+    """
+    Текущее поколение кэша лент.
+
+    Поколение входит в ключи фрагментов лент, поэтому его увеличение
+    разом делает их все недействительными. Начальное значение берется
+    из времени, чтобы после вытеснения ключа из кэша не вернуться
+    к номеру, под которым лежат устаревшие фрагменты.
+    """
+    return shared_cache().get_or_set(
+        FEED_VERSION_KEY, int(time.time() * 1000), None)
+
+
+def invalidate_feeds():
+    """Делает недействительными все закэшированные фрагменты лент."""
+    try:
+        shared_cache().incr(FEED_VERSION_KEY)
+    except ValueError:
+        feed_version()
+
+
+def count_version():
+    """Поколение счетчиков лент; меняется после массовой загрузки."""
+    return shared_cache().get_or_set(
+        COUNT_VERSION_KEY, int(time.time() * 1000), None)
+
+
+def reset_counts():
+    """Делает недействительными все счетчики лент."""
+    try:
+        shared_cache().incr(COUNT_VERSION_KEY)
+    except ValueError:
+        count_version()
+
+
+def count_key(name, version):
+    return f"count:{version}:{name}"
+
+
+def cached_count(name, queryset):
+    """
+    Число записей ленты name для Paginator.
+
+    Значение хранится в общем кэше и меняется сигналами Post на единицу
+    (change_counts). При промахе оно считается заново: оценкой
+    estimated_count или точным COUNT(*). Через FEED_COUNT_CACHE_TIMEOUT
+    секунд значение истекает и тоже пересчитывается, так что
+    расхождения из-за гонок и изменений в обход сигналов не копятся.
+    """
+    key = count_key(name, count_version())
+    count = shared_cache().get(key)
+    if count is None:
+        count = estimated_count(queryset)
+        if count is None:
+            count = queryset.count()
+        shared_cache().add(key, count, getattr(
+            settings, "FEED_COUNT_CACHE_TIMEOUT", 60 * 10))
+    return count
+
+
+def change_counts(names, delta):
+    """Изменяет закэшированные счетчики на delta; отсутствующие пропускает."""
+    version = count_version()
+    for name in names:
+        try:
+            shared_cache().incr(count_key(name, version), delta)
+        except ValueError:
+            pass
+
+
+def feed_cache_context(request, name, scope=""):
+    """
+    Контекст для тега {% cache %} ленты.
+
+    Ключ учитывает ленту, ее область (группа, автор), поколение кэша,
+    страницу или курсор и зрителя: от него зависят меню и кнопки
+    редактирования.
+    """
+    viewer = request.user.pk if request.user.is_authenticated else "anon"
+    if use_cursor(request):
+        position = "cursor=" + request.GET.get(CURSOR_PARAM, "")
+    else:
+        position = "page=" + request.GET.get(PAGE_PARAM, "")
+    key = f"{name}:{scope}:{feed_version()}:{viewer}:{position}"
+    return {
+        "feed_cache_key": key,
+        "feed_cache_timeout": getattr(settings, "FEED_CACHE_TIMEOUT", 300),
+    }
+
+
+def group_key(slug):
+    return f"group:{slug}"
+
+
+def cached_group(slug):
+    """
+    Группа по slug или None, если ее нет.
+
+    Группа хранится в кэше по умолчанию, то есть в памяти процесса перед
+    общим кэшем, и сбрасывается сигналами Group. Значение общее для всех
+    зрителей, поэтому читается из основной базы, а не из реплики.
+    """
+    key = group_key(slug)
+    group = cache.get(key)
+    if group is None:
+        group = Group.objects.db_manager(primary_alias()).filter(
+            slug=slug).first()
+        if group is not None:
+            cache.set(key, group, getattr(
+                settings, "GROUP_CACHE_TIMEOUT", 60 * 60))
+    return group
+
+
+def forget_groups(*slugs):
+    """Удаляет группы с такими slug из кэша."""
+    cache.delete_many([group_key(slug) for slug in slugs if slug])
+
+
+def latest_value(queryset, field):
+    """Наибольшее значение поля; при индексе по полю — один шаг по индексу."""
+    return queryset.order_by("-" + field).values_list(
+        field, flat=True).first()
+
+
+def page_key(name):
+    return f"page:{name}"
+
+
+def page_versions(names):
+    """
+    Поколения областей страниц names.
+
+    Поколение меняется сигналами при правке или удалении записей
+    области, которых не видно по времени последней публикации.
+    Отсутствующее поколение, как и поколение лент, начинается со времени.
+    """
+    keys = [page_key(name) for name in names]
+    versions = shared_cache().get_many(keys)
+    return [
+        versions[key] if key in versions else shared_cache().get_or_set(
+            key, int(time.time() * 1000), None)
+        for key in keys]
+
+
+def touch_pages(names):
+    """Меняет поколения областей страниц names."""
+    for name in set(names):
+        try:
+            shared_cache().incr(page_key(name))
+        except ValueError:
+            pass
+
+
+def invalidate_pages():
+    """Меняет валидаторы всех страниц; нужно после массовой загрузки."""
+    touch_pages([ALL_PAGES])
+
+
+def post_page_names(post_id, username, group_id):
+    """Области страниц, на которых показана публикация."""
+    names = ["posts", f"post:{post_id}", f"author:{username}"]
+    if group_id is not None:
+        names.append(f"group:{group_id}")
+    return names
+
+
+def page_etag(request, posts, comments, names):
+    """
+    ETag страницы.
+
+    Учитывает время последней публикации и последнего комментария
+    области страницы, зрителя и поколения областей names, которые
+    меняются при правке или удалении их записей. Last-Modified страница
+    не отдает: одно время не выражает ни зрителя, ни правки и удаления,
+    и запрос только с If-Modified-Since получил бы устаревший 304.
+    """
+    changes = [
+        value.isoformat() for value in (
+            latest_value(posts, "pub_date"),
+            latest_value(comments, "created"))
+        if value is not None]
+    viewer = request.user.pk if request.user.is_authenticated else "anon"
+    versions = page_versions([ALL_PAGES, *names])
+    state = ":".join([str(viewer), *map(str, versions), *changes])
+    return hashlib.md5(state.encode()).hexdigest()
+
+
+def conditional_page(scope):
+    """
+    Декоратор view: ответ 304 Not Modified, если страница не менялась.
+
+    scope получает аргументы view и возвращает выборки публикаций
+    и комментариев, от которых зависит страница, и имена ее областей
+    для page_versions.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+            etag = quote_etag(page_etag(request, *scope(*args, **kwargs)))
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response["ETag"] = etag
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
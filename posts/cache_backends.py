@@ -0,0 +1,122 @@
+"""
+Двухуровневый кэш.
+
+TwoTierCache держит небольшой LRU в памяти процесса перед общим кэшем
+(Redis, файловый кэш и т. п.), который задается псевдонимом из CACHES.
+Значение живет в локальном уровне не дольше LOCAL_TIMEOUT секунд, поэтому
+изменения, сделанные другими процессами, видны с этой задержкой. Изменяемые
+счетчики (поколения кэша лент) нужно читать напрямую из общего кэша,
+свойство shared.
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+class TwoTierCache(BaseCache):
+    """
+    Кэш с локальным LRU перед общим кэшем.
+
+    OPTIONS: SHARED — псевдоним общего кэша, LOCAL_MAX_ENTRIES — размер
+    локального уровня, LOCAL_TIMEOUT — время жизни в нем в секундах.
+    Ключи передаются в общий кэш с версией этого кэша, так что смена
+    VERSION в настройках делает недействительными все ключи сразу.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._shared_alias = options["SHARED"]
+        self._local_max_entries = options.get("LOCAL_MAX_ENTRIES", 1000)
+        self._local_timeout = options.get("LOCAL_TIMEOUT", 5)
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def _version(self, version):
+        return self.version if version is None else version
+
+    def _local_get(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            expires, pickled = entry
+            if expires <= time.time():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+        return pickled
+
+    def _local_set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        expires = time.time() + self._local_timeout
+        backend_timeout = self.get_backend_timeout(timeout)
+        if backend_timeout is not None:
+            expires = min(expires, backend_timeout)
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._local[key] = (expires, pickled)
+            self._local.move_to_end(key)
+            while len(self._local) > self._local_max_entries:
+                self._local.popitem(last=False)
+
+    def _local_delete(self, key):
+        with self._lock:
+            self._local.pop(key, None)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        version = self._version(version)
+        added = self.shared.add(key, value, timeout, version)
+        if added:
+            self._local_set(self.make_key(key, version), value, timeout)
+        return added
+
+    def get(self, key, default=None, version=None):
+        version = self._version(version)
+        local_key = self.make_key(key, version)
+        self.validate_key(local_key)
+        pickled = self._local_get(local_key)
+        if pickled is not None:
+            return pickle.loads(pickled)
+        missing = object()
+        value = self.shared.get(key, missing, version)
+        if value is missing:
+            return default
+        self._local_set(local_key, value)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        version = self._version(version)
+        self.shared.set(key, value, timeout, version)
+        local_key = self.make_key(key, version)
+        if timeout is not None and timeout != DEFAULT_TIMEOUT and timeout <= 0:
+            self._local_delete(local_key)
+        else:
+            self._local_set(local_key, value, timeout)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        version = self._version(version)
+        self._local_delete(self.make_key(key, version))
+        return self.shared.touch(key, timeout, version)
+
+    def delete(self, key, version=None):
+        version = self._version(version)
+        self._local_delete(self.make_key(key, version))
+        self.shared.delete(key, version)
+
+    def incr(self, key, delta=1, version=None):
+        version = self._version(version)
+        self._local_delete(self.make_key(key, version))
+        return self.shared.incr(key, delta, version)
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+        self.shared.clear()
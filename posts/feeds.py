@@ -0,0 +1,214 @@
+"""
+Материализованные ленты подписок.
+
+Публикации обычных авторов раскладываются по лентам подписчиков при
+записи, одним INSERT ... SELECT по подпискам. Публикации популярных
+авторов (не меньше FEED_FANOUT_FOLLOWERS_LIMIT подписчиков) не
+раскладываются, а берутся при чтении; такой автор помечается
+AuthorStats.fanout_skipped. Когда подписчиков становится меньше порога,
+задача catch_up_timelines раскладывает его посты и снимает отметку; до
+этого посты по-прежнему добавляются при чтении и не пропадают из лент.
+"""
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Max, Q
+
+from .models import AuthorStats, Follow, Post, TimelineEntry
+from .sqlite import checkpoint
+from .tasks import enqueue, task
+
+FANOUT_BATCH_SIZE = 1000
+REBUILD_BATCH_SIZE = 500
+TIMELINE_COLUMNS = (
+    ("user", "user_id"),
+    ("author", "author_id"),
+    ("post", "author__posts__id"),
+    ("pub_date", "author__posts__pub_date"),
+)
+
+
+def fanout_limit():
+    """Порог подписчиков, начиная с которого лента собирается при чтении."""
+    return getattr(settings, "FEED_FANOUT_FOLLOWERS_LIMIT", 1000)
+
+
+def fanout_batch_size(model=TimelineEntry, fields=("user", "author", "post")):
+    """
+    Размер пачки записей model, не больше допустимого для базы.
+
+    Django 2.2 не ограничивает явный batch_size в bulk_create, а SQLite
+    не принимает больше 500 строк в одном INSERT с UNION ALL.
+    """
+    fields = [model._meta.get_field(name) for name in fields]
+    ops = connections[router.db_for_write(model)].ops
+    return min(FANOUT_BATCH_SIZE, ops.bulk_batch_size(fields, []))
+
+
+def insert_from_select(model, fields, rows):
+    """
+    Вставляет в model строки выборки rows одним INSERT ... SELECT.
+
+    rows — QuerySet из values_list(), столбцы которого идут в порядке
+    полей fields. Строки, нарушающие уникальность, пропускаются.
+    """
+    using = router.db_for_write(model)
+    connection = connections[using]
+    ops = connection.ops
+    select, params = rows.query.get_compiler(using).as_sql()
+    sql = "%s %s (%s) %s%s" % (
+        ops.insert_statement(ignore_conflicts=True),
+        ops.quote_name(model._meta.db_table),
+        ", ".join(ops.quote_name(model._meta.get_field(name).column)
+                  for name in fields),
+        select,
+        ops.ignore_conflicts_suffix_sql(ignore_conflicts=True))
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def fill_timelines(follows, post=None):
+    """
+    Добавляет в ленты подписчиков из follows посты их авторов.
+
+    С post добавляется только этот пост. Строки лент собирает база
+    соединением подписок с постами, без выборки их в Python.
+    """
+    lookups = {"user__isnull": False, "author__posts__isnull": False}
+    if post is not None:
+        lookups["author__posts"] = post
+    rows = follows.filter(**lookups).order_by().values_list(
+        *(lookup for _, lookup in TIMELINE_COLUMNS))
+    insert_from_select(
+        TimelineEntry, [name for name, _ in TIMELINE_COLUMNS], rows)
+
+
+def hybrid_condition(prefix=""):
+    """
+    Условие на счетчики автора, чьи посты берутся при чтении.
+
+    prefix — путь к AuthorStats от модели выборки, например "author__stats__".
+    """
+    return (Q(**{f"{prefix}followers_count__gte": fanout_limit()})
+            | Q(**{f"{prefix}fanout_skipped": True}))
+
+
+def is_hybrid_author(author_id):
+    """
+    Автор, чьи публикации не раскладываются по лентам подписчиков.
+
+    Это популярный автор или автор, ставший обычным, чьи посты еще
+    не разложены задачей catch_up_timelines.
+    """
+    return AuthorStats.objects.filter(
+        hybrid_condition(), user_id=author_id).exists()
+
+
+def fan_out_post(post):
+    """Добавляет новую публикацию в ленты подписчиков автора."""
+    if is_hybrid_author(post.author_id):
+        AuthorStats.objects.filter(
+            user_id=post.author_id, fanout_skipped=False).update(
+                fanout_skipped=True)
+        return
+    fill_timelines(Follow.objects.filter(author_id=post.author_id), post)
+
+
+def backfill_timeline(user_id, author_id):
+    """Заполняет ленту подписчика публикациями нового автора."""
+    if is_hybrid_author(author_id):
+        return
+    fill_timelines(Follow.objects.filter(user_id=user_id, author_id=author_id))
+
+
+def prune_timeline(user_id, author_id):
+    """Удаляет из ленты подписчика публикации автора."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def follower_lost(author_id):
+    """
+    Ставит в очередь раскладку постов автора, ставшего обычным.
+
+    Вызывается после отписки: пока задача не выполнена, посты автора
+    по-прежнему добавляются в ленты при чтении.
+    """
+    if AuthorStats.objects.filter(
+            user_id=author_id,
+            fanout_skipped=True,
+            followers_count__lt=fanout_limit()).exists():
+        enqueue(catch_up_timelines, author_id)
+
+
+@task
+def catch_up_timelines(author_id):
+    """Раскладывает по лентам посты автора и снимает fanout_skipped."""
+    with transaction.atomic():
+        stats = AuthorStats.objects.select_for_update().filter(
+            user_id=author_id,
+            fanout_skipped=True,
+            followers_count__lt=fanout_limit())
+        if not stats.exists():
+            return
+        stats.update(fanout_skipped=False)
+        fill_timelines(Follow.objects.filter(author_id=author_id))
+
+
+def hybrid_follows(user):
+    """Авторы из подписок пользователя, чьи посты берутся при чтении."""
+    return Follow.objects.filter(
+        hybrid_condition("author__stats__"), user=user).values("author_id")
+
+
+def follow_feed(user):
+    """
+    Публикации ленты подписок пользователя.
+
+    Основная часть берется из материализованной ленты, публикации
+    популярных авторов добавляются при чтении.
+    """
+    return Post.objects.filter(
+        Q(pk__in=TimelineEntry.objects.filter(user=user).values("post_id"))
+        | Q(author__in=hybrid_follows(user)))
+
+
+def follow_feed_ids(user):
+    """
+    Пары (ключ поста, дата) ленты подписок от новых к старым.
+
+    Записи ленты и посты популярных авторов объединяются UNION ALL;
+    каждая часть упорядочена своим индексом, (user, -pub_date) ленты
+    и (author, -pub_date) постов, поэтому страница выбирается без
+    сортировки всей ленты. Записи ленты популярных авторов, оставшиеся
+    с тех пор, как они были обычными, исключаются, чтобы не повторяться.
+    """
+    hybrid = hybrid_follows(user)
+    timeline = TimelineEntry.objects.filter(user=user).exclude(
+        author__in=hybrid).values_list("post_id", "pub_date")
+    posts = Post.objects.filter(author__in=hybrid).order_by().values_list(
+        "pk", "pub_date")
+    return timeline.union(posts, all=True).order_by("-pub_date", "-post_id")
+
+
+def rebuild_timelines(batch_size=REBUILD_BATCH_SIZE):
+    """
+    Заново строит материализованные ленты всех подписчиков.
+
+    Ленты заполняются INSERT ... SELECT по batch_size подписок; каждая
+    пачка пишется в своей транзакции, после которой журнал WAL переносится
+    в базу, поэтому журнал не растет до размера всех лент. Пока идет
+    пересборка, ленты неполны. После нее посты всех обычных авторов
+    разложены, и отметки fanout_skipped снимаются.
+    """
+    using = router.db_for_write(TimelineEntry)
+    popular = AuthorStats.objects.filter(
+        followers_count__gte=fanout_limit())
+    follows = Follow.objects.exclude(author__in=popular.values("user_id"))
+    TimelineEntry.objects.all().delete()
+    last_pk = Follow.objects.aggregate(last_pk=Max("pk"))["last_pk"] or 0
+    for start in range(0, last_pk, batch_size):
+        with transaction.atomic(using=using):
+            fill_timelines(follows.filter(
+                pk__gt=start, pk__lte=start + batch_size))
+        checkpoint(connections[using])
+    AuthorStats.objects.filter(fanout_skipped=True).exclude(
+        pk__in=popular.values("pk")).update(fanout_skipped=False)
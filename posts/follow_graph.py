@@ -0,0 +1,188 @@
+"""
+Граф подписок.
+
+Для каждого пользователя в общем кэше хранятся ключи авторов, на которых
+он подписан, и ключи его подписчиков — отсортированные массивы array("q")
+по 8 байт на связь. Массив лежит кусками по FOLLOW_GRAPH_CHUNK_SIZE
+ключей; оглавление хранит длину массива и первый ключ каждого куска.
+Страница списка читает из кэша оглавление и куски страницы, проверка
+подписки — оглавление и один кусок с двоичным поиском. Оглавления
+сбрасываются сигналами при создании и удалении Follow; куски каждой
+загрузки пишутся под новым токеном, поэтому старое оглавление никогда
+не смешивается с кусками новой загрузки.
+"""
+import secrets
+from array import array
+from bisect import bisect_left, bisect_right
+
+from django.conf import settings
+from django.db import transaction
+
+from .cache import shared_cache
+from .models import Follow
+from .routers import primary_alias
+
+FOLLOWING = "following"
+FOLLOWERS = "followers"
+
+
+def graph_key(kind, user_id):
+    return f"follow:{kind}:{user_id}"
+
+
+def chunk_key(kind, user_id, token, number):
+    return f"{graph_key(kind, user_id)}:{token}:{number}"
+
+
+def cache_timeout():
+    return getattr(settings, "FOLLOW_GRAPH_CACHE_TIMEOUT", 60 * 60)
+
+
+def chunk_size():
+    return getattr(settings, "FOLLOW_GRAPH_CHUNK_SIZE", 1000)
+
+
+def load_ids(kind, user_id):
+    """
+    Ключи связанных пользователей из базы.
+
+    Массив общий для всех зрителей, поэтому читается из основной базы,
+    а не из реплики, которая может отставать.
+    """
+    follows = Follow.objects.db_manager(primary_alias()).exclude(user=None)
+    if kind == FOLLOWING:
+        ids = follows.filter(user_id=user_id).values_list(
+            "author_id", flat=True)
+    else:
+        ids = follows.filter(author_id=user_id).values_list(
+            "user_id", flat=True)
+    return array("q", sorted(ids))
+
+
+class RelatedIds:
+    """
+    Отсортированные ключи связанных пользователей.
+
+    Ведет себя как последовательность: длина берется из оглавления,
+    срез и проверка вхождения читают из кэша только нужные куски.
+    Если кусок вытеснен из кэша, массив загружается из базы заново.
+    """
+
+    def __init__(self, kind, user_id):
+        self.kind = kind
+        self.user_id = user_id
+        self.chunks = {}
+        contents = shared_cache().get(graph_key(kind, user_id))
+        if contents is None:
+            self.reload()
+        else:
+            self.token, self.size, self.count, self.heads = contents
+
+    def reload(self):
+        """Загружает массив из базы и кладет в кэш под новым токеном."""
+        ids = load_ids(self.kind, self.user_id)
+        self.token = secrets.token_hex(4)
+        self.size = chunk_size()
+        self.count = len(ids)
+        self.heads = ids[::self.size]
+        self.chunks = {
+            number: ids[start:start + self.size]
+            for number, start in enumerate(range(0, self.count, self.size))}
+        timeout = cache_timeout()
+        shared_cache().set_many({
+            chunk_key(self.kind, self.user_id, self.token, number): chunk
+            for number, chunk in self.chunks.items()}, timeout)
+        shared_cache().set(
+            graph_key(self.kind, self.user_id),
+            (self.token, self.size, self.count, self.heads), timeout)
+
+    def fetch(self, numbers):
+        """
+        Читает из кэша недостающие куски с номерами numbers.
+
+        Возвращает False, если кусков в кэше не оказалось и массив
+        пришлось загрузить заново: его длина могла измениться.
+        """
+        keys = {
+            chunk_key(self.kind, self.user_id, self.token, number): number
+            for number in numbers if number not in self.chunks}
+        if not keys:
+            return True
+        found = shared_cache().get_many(keys)
+        if len(found) < len(keys):
+            self.reload()
+            return False
+        for key, chunk in found.items():
+            self.chunks[keys[key]] = chunk
+        return True
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            start = item + self.count if item < 0 else item
+            if not 0 <= start < self.count:
+                raise IndexError("related ids index out of range")
+            return self[start:start + 1][0]
+        start, stop, step = item.indices(self.count)
+        if step < 0:
+            return self[:][item]
+        if start >= stop:
+            return array("q")
+        numbers = range(start // self.size, (stop - 1) // self.size + 1)
+        if not self.fetch(numbers):
+            return self[item]
+        ids = array("q")
+        for number in numbers:
+            ids.extend(self.chunks[number])
+        offset = numbers.start * self.size
+        return ids[start - offset:stop - offset:step]
+
+    def __contains__(self, value):
+        number = bisect_right(self.heads, value) - 1
+        if number < 0:
+            return False
+        if not self.fetch([number]):
+            return value in self
+        chunk = self.chunks[number]
+        index = bisect_left(chunk, value)
+        return index < len(chunk) and chunk[index] == value
+
+
+def following_ids(user_id):
+    """Отсортированные ключи авторов, на которых подписан пользователь."""
+    return RelatedIds(FOLLOWING, user_id)
+
+
+def follower_ids(user_id):
+    """Отсортированные ключи подписчиков пользователя."""
+    return RelatedIds(FOLLOWERS, user_id)
+
+
+def is_following(user, author):
+    """Подписан ли пользователь на автора."""
+    if not user.is_authenticated:
+        return False
+    return author.pk in following_ids(user.pk)
+
+
+def forget_follows(pairs):
+    """
+    Сбрасывает оглавления массивов для пар (подписчик, автор).
+
+    Оглавления удаляются сразу, чтобы изменение было видно в той же
+    транзакции, и еще раз после ее фиксации: иначе параллельный запрос
+    мог бы успеть сохранить в кэш состояние до изменения. Куски старых
+    загрузок больше не читаются и истекают сами.
+    """
+    keys = set()
+    for user_id, author_id in pairs:
+        if user_id is not None:
+            keys.add(graph_key(FOLLOWING, user_id))
+        keys.add(graph_key(FOLLOWERS, author_id))
+    if not keys:
+        return
+    shared_cache().delete_many(keys)
+    transaction.on_commit(
+        lambda: shared_cache().delete_many(keys), using=primary_alias())
@@ -9,6 +9,11 @@ class PostForm(ModelForm):
         model = Post
         fields = ("group", "text", "image",)
 
+    def save(self, commit=True):
+        if "image" in self.changed_data:
+            self.instance.thumbnail = None
+        return super().save(commit)
+
 
 class CommentForm(ModelForm):
     """Форма создания нового комментария."""
@@ -0,0 +1,78 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test.utils import (setup_test_environment,
+                               teardown_test_environment)
+
+from posts import benchmark
+
+BASELINE_PATH = os.path.join(settings.BASE_DIR, "benchmark_baseline.json")
+
+
+class Command(BaseCommand):
+    help = ("Замеряет все страницы posts на синтетических данных во "
+            "временной базе и сравнивает результат с эталоном.")
+
+    def add_arguments(self, parser):
+        for name, default in benchmark.DATASET.items():
+            parser.add_argument(
+                f"--{name}", type=int, default=default,
+                help=f"Сколько создать объектов: {name}.")
+        parser.add_argument(
+            "--requests", type=int, default=20,
+            help="Сколько раз запросить каждый адрес.")
+        parser.add_argument(
+            "--seed", type=int, default=0,
+            help="Начальное значение генератора данных.")
+        parser.add_argument(
+            "--baseline", default=BASELINE_PATH,
+            help="Файл эталона.")
+        parser.add_argument(
+            "--update-baseline", action="store_true",
+            help="Записать результат как новый эталон.")
+
+    def mirror_test_db(self):
+        """Зеркала default, как и в тестах, читают из временной базы."""
+        for alias in connections:
+            settings_dict = connections[alias].settings_dict
+            if settings_dict["TEST"].get("MIRROR") == DEFAULT_DB_ALIAS:
+                connections[alias].close()
+                connections[alias].creation.set_as_test_mirror(
+                    connection.settings_dict)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False)
+        self.mirror_test_db()
+        try:
+            benchmark.seed_dataset(
+                seed=options["seed"],
+                **{name: options[name] for name in benchmark.DATASET})
+            results = benchmark.run(options["requests"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        for name, metrics in results.items():
+            self.stdout.write(
+                f"{name:<18} {metrics['status']} "
+                f"запросов: {metrics['queries']:<4} "
+                f"p50: {metrics['p50_ms']:>8} мс "
+                f"p95: {metrics['p95_ms']:>8} мс "
+                f"байт: {metrics['bytes']}")
+
+        if options["update_baseline"]:
+            benchmark.save_baseline(options["baseline"], results)
+            self.stdout.write(self.style.SUCCESS("Эталон обновлен."))
+            return
+        if not os.path.exists(options["baseline"]):
+            raise CommandError(
+                "Эталон не найден, запустите с --update-baseline.")
+        failures = benchmark.compare(
+            results, benchmark.load_baseline(options["baseline"]))
+        if failures:
+            raise CommandError("Эталон превышен:\n" + "\n".join(failures))
+        self.stdout.write(self.style.SUCCESS("Эталон не превышен."))
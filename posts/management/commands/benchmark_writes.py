@@ -0,0 +1,54 @@
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import (setup_test_environment,
+                               teardown_test_environment)
+
+from posts import benchmark
+from posts.sqlite import sqlite_pragmas
+
+
+class Command(BaseCommand):
+    help = ("Замеряет параллельную запись постов и комментариев во "
+            "временную базу SQLite с настройками по умолчанию и с "
+            "SQLITE_PRAGMAS.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threads", type=int, default=8,
+            help="Сколько потоков пишут одновременно.")
+        parser.add_argument(
+            "--writes", type=int, default=200,
+            help="Сколько записей делает каждый поток.")
+
+    def handle(self, *args, **options):
+        modes = (
+            ("по умолчанию", benchmark.DEFAULT_SQLITE_PRAGMAS),
+            ("SQLITE_PRAGMAS", sqlite_pragmas()),
+        )
+        test_settings = connection.settings_dict["TEST"]
+        test_name = test_settings.get("NAME")
+        setup_test_environment()
+        with tempfile.TemporaryDirectory() as directory:
+            test_settings["NAME"] = os.path.join(directory, "writes.sqlite3")
+            old_name = connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, serialize=False)
+            try:
+                results = [
+                    (title, benchmark.run_writes(
+                        options["threads"], options["writes"], pragmas))
+                    for title, pragmas in modes]
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                test_settings["NAME"] = test_name
+                teardown_test_environment()
+
+        for title, metrics in results:
+            self.stdout.write(
+                f"{title:<16} журнал: {metrics['journal_mode']:<7} "
+                f"записей: {metrics['written']:<6} "
+                f"ошибок: {metrics['errors']:<4} "
+                f"время: {metrics['seconds']:>7} с "
+                f"записей/с: {metrics['writes_per_s']}")
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from posts.models import Post
+from posts.thumbnails import build_thumbnail
+
+
+class Command(BaseCommand):
+    help = "Строит недостающие миниатюры изображений постов."
+
+    def handle(self, *args, **options):
+        post_ids = Post.objects.exclude(image="").exclude(image=None).filter(
+            Q(thumbnail=None) | Q(thumbnail="")).values_list("pk", flat=True)
+        built = 0
+        for post_id in post_ids.iterator():
+            build_thumbnail(post_id)
+            built += 1
+        self.stdout.write(self.style.SUCCESS(f"Построено миниатюр: {built}."))
@@ -0,0 +1,71 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from posts.models import Comment, Follow, Group, Post, User
+
+REPEAT = 50
+
+
+class Rollback(Exception):
+    """Откат транзакции, в которой были временно удалены индексы."""
+
+
+class Command(BaseCommand):
+    help = ("Показывает планы и время горячих запросов лент. С ключом "
+            "--without-indexes индексы лент временно удаляются, чтобы "
+            "сравнить планы до и после.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--without-indexes", action="store_true",
+            help="Выполнить запросы без составных индексов Post и Comment.")
+        parser.add_argument(
+            "--repeat", type=int, default=REPEAT,
+            help="Сколько раз выполнить запрос для замера времени.")
+
+    def handle(self, *args, **options):
+        if not options["without_indexes"]:
+            self.report(options["repeat"])
+            return
+        try:
+            with transaction.atomic():
+                self.drop_indexes()
+                self.report(options["repeat"])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def drop_indexes(self):
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            for model in (Post, Comment):
+                for index in model._meta.indexes:
+                    cursor.execute(f"DROP INDEX {quote(index.name)}")
+
+    def queries(self):
+        """Горячие запросы с параметрами из существующих данных."""
+        user = User.objects.order_by("pk").first() or User(pk=1)
+        group = Group.objects.order_by("pk").first() or Group(pk=1)
+        post = Post.objects.order_by("pk").first() or Post(pk=1)
+        return {
+            "profile": Post.objects.filter(author=user).order_by(
+                "-pub_date")[:10],
+            "group_posts": Post.objects.filter(group=group).order_by(
+                "-pub_date")[:10],
+            "post_comments": Comment.objects.filter(post=post).order_by(
+                "created"),
+            "following_ids": Follow.objects.filter(user=user).values_list(
+                "author_id", flat=True),
+        }
+
+    def report(self, repeat):
+        for name, queryset in self.queries().items():
+            started = time.perf_counter()
+            for _ in range(repeat):
+                list(queryset.all())
+            elapsed = (time.perf_counter() - started) / repeat * 1000
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{name}: {elapsed:.3f} мс"))
+            self.stdout.write(queryset.explain())
@@ -0,0 +1,33 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts.transfer import COPY_WORKERS, export_records
+
+
+class Command(BaseCommand):
+    help = ("Выгружает пользователей, группы, посты, комментарии и "
+            "подписки в NDJSON.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "output", nargs="?", default="-",
+            help="Файл NDJSON; по умолчанию стандартный вывод.")
+        parser.add_argument(
+            "--media", help="Каталог, в который копируются изображения.")
+        parser.add_argument(
+            "--workers", type=int, default=COPY_WORKERS,
+            help="Число потоков копирования изображений.")
+
+    def handle(self, *args, **options):
+        if options["output"] == "-":
+            counts = export_records(
+                sys.stdout, options["media"], options["workers"])
+            report = sys.stderr
+        else:
+            with open(options["output"], "w", encoding="utf-8") as output:
+                counts = export_records(
+                    output, options["media"], options["workers"])
+            report = self.stdout
+        for model, count in counts.items():
+            report.write(f"{model}: {count}\n")
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from posts.transfer import BATCH_SIZE, COPY_WORKERS, import_records
+
+
+class Command(BaseCommand):
+    help = ("Загружает NDJSON, выгруженный export_posts. Прерванную "
+            "загрузку можно продолжить с контрольной точки.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", help="Файл NDJSON.")
+        parser.add_argument(
+            "--media", help="Каталог с изображениями из export_posts.")
+        parser.add_argument(
+            "--batch-size", type=int, default=BATCH_SIZE,
+            help="Число записей в одной транзакции.")
+        parser.add_argument(
+            "--workers", type=int, default=COPY_WORKERS,
+            help="Число потоков копирования изображений.")
+        parser.add_argument(
+            "--checkpoint",
+            help="Файл контрольной точки; по умолчанию <input>.checkpoint.")
+
+    def handle(self, *args, **options):
+        checkpoint = options["checkpoint"] or options["input"] + ".checkpoint"
+        with open(options["input"], encoding="utf-8") as stream:
+            loaded, skipped = import_records(
+                stream, checkpoint, options["media"],
+                options["batch_size"], options["workers"])
+        for model, count in loaded.items():
+            self.stdout.write(
+                f"{model}: {count}, пропущено: {skipped.get(model, 0)}")
+        self.stdout.write(self.style.SUCCESS(
+            "Загрузка завершена. Миниатюры строит build_thumbnails."))
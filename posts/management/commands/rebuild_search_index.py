@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Заново строит поисковый индекс постов и комментариев."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=1000,
+            help="Число записей, читаемых из базы за один запрос.")
+
+    def handle(self, *args, **options):
+        rebuild_index(options["batch_size"])
+        self.stdout.write(self.style.SUCCESS("Поисковый индекс построен."))
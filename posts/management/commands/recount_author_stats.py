@@ -0,0 +1,68 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.models import AuthorStats, Comment, Follow, Post, User
+
+BATCH_SIZE = 1000
+
+
+def count_by(model, field):
+    """Подзапрос с числом записей model, ссылающихся на пользователя."""
+    counts = model.objects.filter(**{field: OuterRef("pk")}).order_by(
+    ).values(field).annotate(total=Count("pk")).values("total")
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счетчики авторов и исправляет расхождения."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=BATCH_SIZE,
+            help="Число пользователей, обрабатываемых за одну транзакцию.")
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Только показать число расхождений, ничего не меняя.")
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by("pk").annotate(
+            real_posts_count=count_by(Post, "author"),
+            real_comments_count=count_by(Comment, "author"),
+            real_followers_count=count_by(Follow, "author"),
+            real_following_count=count_by(Follow, "user"),
+        ).values("pk", *(f"real_{name}" for name in AuthorStats.COUNTERS))
+        repaired = created = 0
+        rows = users.iterator(chunk_size=options["batch_size"])
+        for batch in iter(lambda: list(islice(rows, options["batch_size"])),
+                          []):
+            updated, added = self.repair(batch, options["dry_run"])
+            repaired += updated
+            created += added
+        self.stdout.write(self.style.SUCCESS(
+            f"Исправлено: {repaired}, создано: {created}."))
+
+    def repair(self, rows, dry_run):
+        """Сверяет пачку пользователей и сохраняет отличающиеся счетчики."""
+        existing = AuthorStats.objects.in_bulk([row["pk"] for row in rows])
+        to_update, to_create = [], []
+        for row in rows:
+            values = {
+                name: row[f"real_{name}"] for name in AuthorStats.COUNTERS}
+            stats = existing.get(row["pk"])
+            if stats is None:
+                to_create.append(AuthorStats(user_id=row["pk"], **values))
+            elif any(getattr(stats, name) != value
+                     for name, value in values.items()):
+                for name, value in values.items():
+                    setattr(stats, name, value)
+                to_update.append(stats)
+        if not dry_run:
+            with transaction.atomic():
+                AuthorStats.objects.bulk_create(to_create)
+                AuthorStats.objects.bulk_update(
+                    to_update, AuthorStats.COUNTERS)
+        return len(to_update), len(to_create)
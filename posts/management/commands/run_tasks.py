@@ -0,0 +1,37 @@
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.tasks import run_workers
+
+
+class Command(BaseCommand):
+    help = ("Выполняет фоновые задачи из очереди в базе данных "
+            "(построение миниатюр и т. п.).")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency", type=int, default=settings.TASK_WORKERS,
+            help="Число параллельных исполнителей.")
+        parser.add_argument(
+            "--poll-interval", type=float,
+            default=settings.TASK_POLL_INTERVAL,
+            help="Пауза в секундах, когда очередь пуста.")
+        parser.add_argument(
+            "--once", action="store_true",
+            help="Выполнить готовые задачи и завершиться.")
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        try:
+            done = run_workers(
+                options["concurrency"],
+                once=options["once"],
+                poll_interval=options["poll_interval"],
+                stop=stop)
+        except KeyboardInterrupt:
+            stop.set()
+            self.stdout.write("Остановлено.")
+            return
+        self.stdout.write(self.style.SUCCESS(f"Выполнено задач: {done}."))
@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.seed import BATCH_SIZE, generate, rebuild_derived
+
+
+class Command(BaseCommand):
+    help = ("Заполняет базу синтетическими пользователями, группами, "
+            "постами, комментариями и подписками для нагрузочных замеров.")
+
+    def add_arguments(self, parser):
+        for name, default in (("users", 1000), ("groups", 50),
+                              ("posts", 100000), ("comments", 300000),
+                              ("follows", 20000)):
+            parser.add_argument(
+                f"--{name}", type=int, default=default,
+                help=f"Сколько создать объектов: {name}.")
+        parser.add_argument(
+            "--seed", type=int, default=0,
+            help="Начальное значение генератора; одинаковое дает "
+                 "одинаковые данные.")
+        parser.add_argument(
+            "--images", type=float, default=0.0,
+            help="Доля постов со сгенерированным изображением, от 0 до 1.")
+        parser.add_argument(
+            "--prefix", default="seed",
+            help="Префикс имен пользователей и slug групп.")
+        parser.add_argument(
+            "--batch-size", type=int, default=BATCH_SIZE,
+            help="Число объектов в одной транзакции.")
+        parser.add_argument(
+            "--skip-derived", action="store_true",
+            help="Не пересчитывать счетчики, ленты и поисковый индекс.")
+        parser.add_argument(
+            "--skip-timelines", action="store_true",
+            help="Не строить материализованные ленты подписок.")
+        parser.add_argument(
+            "--skip-search-index", action="store_true",
+            help="Не строить поисковый индекс.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        generate(
+            options["users"], options["groups"], options["posts"],
+            options["comments"], options["follows"],
+            seed=options["seed"],
+            images=options["images"],
+            prefix=options["prefix"],
+            batch_size=options["batch_size"],
+            log=self.stdout.write)
+        if not options["skip_derived"]:
+            self.stdout.write("Пересчет счетчиков, лент и индекса...")
+            rebuild_derived(
+                timelines=not options["skip_timelines"],
+                search_index=not options["skip_search_index"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово за {time.perf_counter() - started:.1f} с."))
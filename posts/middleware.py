@@ -0,0 +1,198 @@
+"""
+Профилирование запросов.
+
+ProfilingMiddleware считает для каждого запроса число и время SQL-запросов,
+время отрисовки шаблонов и попадания в кэш, отдает их в заголовке
+Server-Timing и хранит выборку самых медленных запросов для админки.
+"""
+import random
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template.backends.django import Template
+from django.utils import timezone
+
+from .routers import PIN_COOKIE, begin_request, pin_seconds, request_wrote
+
+_local = threading.local()
+_slow_requests = deque(maxlen=50)
+_slow_requests_lock = threading.Lock()
+_instrumented = False
+_instrument_lock = threading.Lock()
+
+
+class RequestProfile:
+    """Показатели одного запроса."""
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def server_timing(self, total):
+        return ", ".join((
+            f'sql;dur={self.sql_time * 1000:.1f};'
+            f'desc="{self.sql_count} queries"',
+            f"tpl;dur={self.template_time * 1000:.1f}",
+            f'cache;desc="hits={self.cache_hits} misses={self.cache_misses}"',
+            f"total;dur={total * 1000:.1f}",
+        ))
+
+
+def current_profile():
+    return getattr(_local, "profile", None)
+
+
+def _sql_wrapper(execute, sql, params, many, context):
+    profile = current_profile()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.sql_count += 1
+        profile.sql_time += time.perf_counter() - started
+
+
+def _timed_render(render):
+    @wraps(render)
+    def wrapper(*args, **kwargs):
+        profile = current_profile()
+        if profile is None:
+            return render(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return render(*args, **kwargs)
+        finally:
+            profile.template_time += time.perf_counter() - started
+    return wrapper
+
+
+def _counted_get(get):
+    missing = object()
+
+    @wraps(get)
+    def wrapper(self, key, default=None, version=None):
+        value = get(self, key, missing, version)
+        profile = current_profile()
+        if profile is not None:
+            if value is missing:
+                profile.cache_misses += 1
+            else:
+                profile.cache_hits += 1
+        return default if value is missing else value
+    return wrapper
+
+
+def instrument():
+    """Подключает замеры к шаблонам и кэшам один раз на процесс."""
+    global _instrumented
+    with _instrument_lock:
+        if _instrumented:
+            return
+        Template.render = _timed_render(Template.render)
+        tiers = {
+            config.get("OPTIONS", {}).get("SHARED")
+            for config in settings.CACHES.values()}
+        backends = {
+            type(caches[alias])
+            for alias in settings.CACHES if alias not in tiers}
+        for backend in backends:
+            backend.get = _counted_get(backend.get)
+        _instrumented = True
+
+
+def slow_requests():
+    """Самые медленные из отобранных запросов, от медленных к быстрым."""
+    with _slow_requests_lock:
+        return sorted(
+            _slow_requests, key=lambda item: item["total_ms"], reverse=True)
+
+
+def _record(request, response, profile, total):
+    entry = {
+        "time": timezone.now(),
+        "method": request.method,
+        "path": request.get_full_path(),
+        "status": response.status_code,
+        "total_ms": round(total * 1000, 1),
+        "sql_count": profile.sql_count,
+        "sql_ms": round(profile.sql_time * 1000, 1),
+        "template_ms": round(profile.template_time * 1000, 1),
+        "cache_hits": profile.cache_hits,
+        "cache_misses": profile.cache_misses,
+    }
+    with _slow_requests_lock:
+        if len(_slow_requests) == _slow_requests.maxlen:
+            fastest = min(_slow_requests, key=lambda item: item["total_ms"])
+            if fastest["total_ms"] >= entry["total_ms"]:
+                return
+            _slow_requests.remove(fastest)
+        _slow_requests.append(entry)
+
+
+class ProfilingMiddleware:
+    """
+    Промежуточный слой профилирования запросов.
+
+    PROFILING_SERVER_TIMING включает заголовок Server-Timing,
+    PROFILING_SAMPLE_RATE задает долю запросов, попадающих в буфер
+    медленных запросов, PROFILING_BUFFER_SIZE — размер буфера.
+    """
+
+    def __init__(self, get_response):
+        global _slow_requests
+        self.get_response = get_response
+        buffer_size = getattr(settings, "PROFILING_BUFFER_SIZE", 50)
+        if _slow_requests.maxlen != buffer_size:
+            _slow_requests = deque(maxlen=buffer_size)
+        instrument()
+
+    def __call__(self, request):
+        profile = _local.profile = RequestProfile()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(_sql_wrapper))
+                response = self.get_response(request)
+        finally:
+            _local.profile = None
+        total = time.perf_counter() - started
+        if getattr(settings, "PROFILING_SERVER_TIMING", False):
+            response["Server-Timing"] = profile.server_timing(total)
+        sample_rate = getattr(settings, "PROFILING_SAMPLE_RATE", 1.0)
+        if random.random() < sample_rate:
+            _record(request, response, profile, total)
+        return response
+
+
+class ReplicaPinMiddleware:
+    """
+    Закрепляет чтения пользователя за основной базой после его записи.
+
+    Ответ на запрос, записавший в базу, ставит cookie, при которой
+    view-функции лент не читают с реплики. Метод запроса не важен:
+    подписка и отписка пишут по GET.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        begin_request()
+        response = self.get_response(request)
+        if request_wrote():
+            response.set_cookie(
+                PIN_COOKIE, "1", max_age=pin_seconds(), httponly=True)
+        return response
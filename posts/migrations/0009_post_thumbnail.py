@@ -0,0 +1,18 @@
+# Generated by Django 2.2.6 on 2026-10-17 05:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, help_text='Миниатюра изображения для лент', null=True, upload_to='', verbose_name='Миниатюра'),
+        ),
+    ]
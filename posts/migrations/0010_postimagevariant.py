@@ -0,0 +1,28 @@
+# Generated by Django 2.2.6 on 2026-10-17 05:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_post_thumbnail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostImageVariant',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('width', models.PositiveIntegerField(verbose_name='Ширина')),
+                ('format', models.CharField(choices=[('avif', 'AVIF'), ('webp', 'WEBP'), ('jpeg', 'JPEG')], max_length=10, verbose_name='Формат')),
+                ('image', models.ImageField(upload_to='posts/variants/', verbose_name='Изображение')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_variants', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'ordering': ('width',),
+                'unique_together': {('post', 'width', 'format')},
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+from django.db import migrations
+
+from posts.stemmer import stem_text
+
+BATCH_SIZE = 1000
+INSERT_DOCUMENT = (
+    "INSERT OR REPLACE INTO posts_search (rowid, post_id, body) "
+    "VALUES (%s, %s, %s)")
+
+
+def backfill_search_index(apps, schema_editor):
+    """
+    Заполняет индекс существующими постами и комментариями.
+
+    rowid документа: id * 2 для поста и id * 2 + 1 для комментария.
+    Документы читаются пачками по возрастанию ключа и пишутся одним
+    executemany на пачку.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != "sqlite":
+        return
+    sources = (
+        (0, apps.get_model("posts", "Post").objects.using(
+            connection.alias).values_list("pk", "pk", "text")),
+        (1, apps.get_model("posts", "Comment").objects.using(
+            connection.alias).values_list("pk", "post_id", "text")),
+    )
+    for kind, rows in sources:
+        last_pk = 0
+        while True:
+            batch = list(rows.filter(pk__gt=last_pk).order_by(
+                "pk")[:BATCH_SIZE])
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            with connection.cursor() as cursor:
+                cursor.executemany(INSERT_DOCUMENT, [
+                    (pk * 2 + kind, post_id, " ".join(stem_text(text)))
+                    for pk, post_id, text in batch])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_timeline_pub_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_search_index, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,9 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.safestring import mark_safe
 
 User = get_user_model()
@@ -19,6 +22,32 @@ class Group(models.Model):
         return reverse("group", kwargs={"slug": self.slug})
 
 
+def count_comments():
+    """
+    Число комментариев публикации коррелированным подзапросом.
+
+    В отличие от Count по соединению с комментариями, подзапрос не требует
+    GROUP BY по всей ленте: LIMIT и индекс по дате применяются до подсчета,
+    и комментарии считаются только для публикаций страницы.
+    """
+    comments = Comment.objects.filter(post=OuterRef("pk")).order_by().values(
+        "post").annotate(count=Count("pk")).values("count")
+    return Coalesce(Subquery(comments, output_field=IntegerField()), 0)
+
+
+class PostQuerySet(models.QuerySet):
+    """Выборки публикаций для лент."""
+
+    def for_feed(self):
+        """Публикации со всем, что нужно для вывода в ленте."""
+        return self.select_related("group", "author").prefetch_related(
+            "image_variants").with_comments_count()
+
+    def with_comments_count(self):
+        """Добавляет к каждой публикации число комментариев."""
+        return self.annotate(comments_count=count_comments())
+
+
 class Post(models.Model):
     """Модель публикации."""
     text = models.TextField("Текст поста", help_text="Тут введите текст поста")
@@ -42,9 +71,28 @@ class Post(models.Model):
         blank=True,
         null=True,
         help_text="Изображение поста")
+    thumbnail = models.ImageField(
+        verbose_name="Миниатюра",
+        blank=True,
+        null=True,
+        editable=False,
+        help_text="Миниатюра изображения для лент")
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ("-pub_date",)
+        indexes = (
+            models.Index(
+                fields=("-pub_date",),
+                name="post_pub_date_idx"),
+            models.Index(
+                fields=("author", "-pub_date"),
+                name="post_author_pub_date_idx"),
+            models.Index(
+                fields=("group", "-pub_date"),
+                name="post_group_pub_date_idx"),
+        )
 
     def __str__(self):
         return self.text[:15]
@@ -54,6 +102,19 @@ class Post(models.Model):
             "username": self.author,
             "post_id": self.pk})
 
+    def picture_sources(self):
+        """Источники <picture>: srcset вариантов изображения по форматам."""
+        srcsets = {}
+        for variant in self.image_variants.all():
+            srcsets.setdefault(variant.format, []).append(
+                f"{variant.image.url} {variant.width}w")
+        return [
+            {"type": PostImageVariant.MIME_TYPES[image_format],
+             "srcset": ", ".join(srcsets[image_format])}
+            for image_format in PostImageVariant.FORMATS
+            if image_format in srcsets
+        ]
+
     def image_tag(self):
         if self.image:
             return mark_safe(
@@ -63,6 +124,35 @@ class Post(models.Model):
             return "Нет изображения"
 
 
+class PostImageVariant(models.Model):
+    """Вариант изображения поста заданной ширины и формата."""
+    FORMATS = ("avif", "webp", "jpeg")
+    MIME_TYPES = {
+        "avif": "image/avif",
+        "webp": "image/webp",
+        "jpeg": "image/jpeg",
+    }
+
+    post = models.ForeignKey(
+        Post,
+        verbose_name="Пост",
+        on_delete=models.CASCADE,
+        related_name="image_variants")
+    width = models.PositiveIntegerField("Ширина")
+    format = models.CharField(
+        "Формат",
+        max_length=10,
+        choices=[(name, name.upper()) for name in FORMATS])
+    image = models.ImageField("Изображение", upload_to="posts/variants/")
+
+    class Meta:
+        ordering = ("width",)
+        unique_together = ("post", "width", "format")
+
+    def __str__(self):
+        return f"{self.image.name} ({self.width}w)"
+
+
 class Comment(models.Model):
     """Модель комментариев."""
     post = models.ForeignKey(
@@ -82,6 +172,14 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ("created",)
+        indexes = (
+            models.Index(
+                fields=("post", "created"),
+                name="comment_post_created_idx"),
+            models.Index(
+                fields=("created",),
+                name="comment_created_idx"),
+        )
 
     def __str__(self):
         return self.text[:15]
@@ -102,5 +200,178 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name="following")
 
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=("user", "author"),
+                name="unique_follow"),
+        )
+
     def __str__(self):
         return f"@{self.user.username} is follower @{self.author.username}"
+
+
+class AuthorStatsManager(models.Manager):
+    """Доступ к счетчикам автора с досчетом отсутствующих записей."""
+
+    def for_user(self, user):
+        """Счетчики пользователя; при отсутствии записи считаются заново."""
+        stats = self.filter(user=user).first()
+        if stats is None:
+            stats, _ = self.get_or_create(
+                user=user,
+                defaults=self.model.compute(user))
+        return stats
+
+
+class AuthorStats(models.Model):
+    """
+    Денормализованные счетчики пользователя.
+
+    Поддерживаются сигналами Post, Comment и Follow; расхождения после
+    массовых операций исправляет команда recount_author_stats.
+    fanout_skipped отмечает автора, чьи посты не разложены по лентам
+    подписчиков и добавляются в них при чтении (posts.feeds).
+    """
+    user = models.OneToOneField(
+        User,
+        verbose_name="Пользователь",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats")
+    posts_count = models.PositiveIntegerField("Записей", default=0)
+    comments_count = models.PositiveIntegerField("Комментариев", default=0)
+    followers_count = models.PositiveIntegerField("Подписчиков", default=0)
+    following_count = models.PositiveIntegerField("Подписок", default=0)
+    fanout_skipped = models.BooleanField(
+        "Есть посты вне лент подписчиков", default=False)
+
+    objects = AuthorStatsManager()
+
+    COUNTERS = (
+        "posts_count",
+        "comments_count",
+        "followers_count",
+        "following_count",
+    )
+
+    class Meta:
+        verbose_name = "Счетчики автора"
+        verbose_name_plural = "Счетчики авторов"
+
+    def __str__(self):
+        return f"@{self.user.username}"
+
+    @staticmethod
+    def compute(user):
+        """Точные значения счетчиков пользователя по данным в базе."""
+        return {
+            "posts_count": Post.objects.filter(author=user).count(),
+            "comments_count": Comment.objects.filter(author=user).count(),
+            "followers_count": Follow.objects.filter(author=user).count(),
+            "following_count": Follow.objects.filter(user=user).count(),
+        }
+
+
+class TimelineEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        verbose_name="Подписчик",
+        on_delete=models.CASCADE,
+        related_name="timeline")
+    author = models.ForeignKey(
+        User,
+        verbose_name="Автор",
+        on_delete=models.CASCADE,
+        related_name="+")
+    post = models.ForeignKey(
+        Post,
+        verbose_name="Пост",
+        on_delete=models.CASCADE,
+        related_name="timeline_entries")
+    pub_date = models.DateTimeField("Дата публикации")
+
+    class Meta:
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи лент"
+        unique_together = ("user", "post")
+        index_together = ("user", "author")
+        indexes = (
+            models.Index(
+                fields=("user", "-pub_date"),
+                name="timeline_user_pub_date_idx"),
+        )
+
+    def __str__(self):
+        return f"@{self.user.username}: {self.post}"
+
+
+class Task(models.Model):
+    """Фоновая задача: вызов функции, помеченной posts.tasks.task."""
+    PENDING = "pending"
+    RUNNING = "running"
+    FAILED = "failed"
+    STATUSES = (
+        (PENDING, "В очереди"),
+        (RUNNING, "Выполняется"),
+        (FAILED, "Ошибка"),
+    )
+
+    name = models.CharField("Функция", max_length=200)
+    args = models.TextField("Аргументы (JSON)", default="[]")
+    status = models.CharField(
+        "Состояние", max_length=10, choices=STATUSES, default=PENDING)
+    attempts = models.PositiveIntegerField("Попыток", default=0)
+    max_attempts = models.PositiveIntegerField("Попыток не больше")
+    run_at = models.DateTimeField("Выполнить не раньше", default=timezone.now)
+    locked_by = models.CharField("Исполнитель", max_length=32, blank=True)
+    locked_at = models.DateTimeField("Взята в работу", null=True, blank=True)
+    last_error = models.TextField("Последняя ошибка", blank=True)
+    created = models.DateTimeField("Создана", auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+        indexes = (
+            models.Index(
+                fields=("status", "run_at"), name="task_status_run_at_idx"),
+        )
+
+    def __str__(self):
+        return f"{self.name}{self.args} ({self.status})"
+
+
+class Notification(models.Model):
+    """
+    Новая публикация, о которой подписчику еще не сообщили по почте.
+
+    Записи создаются задачей posts.notifications.notify_followers
+    и удаляются после отправки письма.
+    """
+    recipient = models.ForeignKey(
+        User,
+        verbose_name="Получатель",
+        on_delete=models.CASCADE,
+        related_name="notifications")
+    post = models.ForeignKey(
+        Post,
+        verbose_name="Пост",
+        on_delete=models.CASCADE,
+        related_name="notifications")
+    created = models.DateTimeField("Создано", auto_now_add=True)
+    claimed_by = models.CharField("Рассылка", max_length=32, blank=True)
+    claimed_at = models.DateTimeField(
+        "Взято в рассылку", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Уведомление"
+        verbose_name_plural = "Уведомления"
+        constraints = (
+            models.UniqueConstraint(
+                fields=("recipient", "post"),
+                name="unique_notification"),
+        )
+
+    def __str__(self):
+        return f"@{self.recipient.username}: {self.post}"
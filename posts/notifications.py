@@ -0,0 +1,151 @@
+"""
+Письма подписчикам о новых публикациях.
+
+Новый пост ставит в очередь задачу notify_followers: она записывает
+Notification для каждого подписчика с адресом почты и планирует рассылку
+send_digests через NOTIFY_DIGEST_DELAY секунд. Рассылка собирает все
+накопившиеся у получателя публикации в одно письмо и отправляет письма
+пачками по NOTIFY_BATCH_SIZE через одно соединение с почтовым сервером,
+не быстрее NOTIFY_RATE писем в секунду. Пачку получателей рассылка
+забирает условным UPDATE, как исполнители задач, поэтому параллельные
+рассылки не отправляют одно письмо дважды.
+"""
+import datetime
+import time
+import uuid
+from itertools import groupby
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .feeds import fanout_batch_size
+from .models import Follow, Notification, Post, Task
+from .tasks import enqueue, task
+
+
+def schedule_notifications(post):
+    """
+    Ставит в очередь письма подписчикам автора нового поста.
+
+    Наличие подписчиков проверяется одним шагом по индексу подписок,
+    без загрузки их массива из графа подписок.
+    """
+    if Follow.objects.filter(author_id=post.author_id).exists():
+        enqueue(notify_followers, post.pk)
+
+
+@task
+def notify_followers(post_id):
+    """Записывает уведомления о посте для подписчиков автора."""
+    author_id = Post.objects.filter(pk=post_id).values_list(
+        "author_id", flat=True).first()
+    if author_id is None:
+        return
+    recipients = Follow.objects.filter(
+        author_id=author_id,
+        user__is_active=True,
+    ).exclude(user__email="").values_list("user_id", flat=True)
+    with transaction.atomic():
+        Notification.objects.bulk_create(
+            (Notification(recipient_id=user_id, post_id=post_id)
+             for user_id in recipients.iterator()),
+            batch_size=fanout_batch_size(Notification, ("recipient", "post")),
+            ignore_conflicts=True)
+        schedule_digests()
+
+
+def schedule_digests():
+    """Планирует рассылку, если ждущей рассылки в очереди еще нет."""
+    pending = Task.objects.filter(
+        name=send_digests.task_name, status=Task.PENDING)
+    if not pending.exists():
+        enqueue(send_digests, delay=settings.NOTIFY_DIGEST_DELAY)
+
+
+def claim_recipients(size):
+    """
+    Забирает уведомления не больше чем size получателей.
+
+    Возвращает метку, которой помечены забранные записи, или None, если
+    свободных уведомлений нет. Уведомления, забранные рассылкой и не
+    отправленные за TASK_LOCK_TIMEOUT секунд, считаются свободными.
+    """
+    now = timezone.now()
+    abandoned = now - datetime.timedelta(seconds=settings.TASK_LOCK_TIMEOUT)
+    free = Notification.objects.filter(
+        Q(claimed_by="") | Q(claimed_at__lt=abandoned))
+    recipients = list(free.order_by("recipient_id").values_list(
+        "recipient_id", flat=True).distinct()[:size])
+    if not recipients:
+        return None
+    token = uuid.uuid4().hex
+    free.filter(recipient_id__in=recipients).update(
+        claimed_by=token, claimed_at=now)
+    return token
+
+
+def digest_messages(notifications):
+    """Письма со всеми публикациями из notifications, по одному на адрес."""
+    notifications = notifications.select_related(
+        "recipient", "post__author").order_by(
+            "recipient_id", "post__pub_date", "post_id")
+    messages = []
+    for _, items in groupby(notifications, key=lambda item: item.recipient_id):
+        items = list(items)
+        recipient = items[0].recipient
+        if not recipient.email:
+            continue
+        posts = [item.post for item in items]
+        body = render_to_string("emails/new_posts.txt", {
+            "recipient": recipient,
+            "posts": posts,
+            "site_url": settings.SITE_URL.rstrip("/"),
+        })
+        messages.append(EmailMessage(
+            f"Новые записи в ваших подписках: {len(posts)}",
+            body,
+            to=[recipient.email]))
+    return messages
+
+
+def throttle(started, sent):
+    """Ждет, пока средняя скорость не опустится до NOTIFY_RATE писем/с."""
+    if not settings.NOTIFY_RATE:
+        return
+    delay = sent / settings.NOTIFY_RATE - (time.monotonic() - started)
+    if delay > 0:
+        time.sleep(delay)
+
+
+@task
+def send_digests():
+    """
+    Отправляет накопившиеся уведомления.
+
+    Все пачки уходят через одно соединение. Если рассылка идет дольше
+    половины TASK_LOCK_TIMEOUT, остаток передается новой задаче, чтобы
+    исполнитель не посчитал эту брошенной.
+    """
+    started = time.monotonic()
+    sent = 0
+    with get_connection() as connection:
+        while True:
+            if time.monotonic() - started > settings.TASK_LOCK_TIMEOUT / 2:
+                enqueue(send_digests)
+                return
+            token = claim_recipients(settings.NOTIFY_BATCH_SIZE)
+            if token is None:
+                return
+            claimed = Notification.objects.filter(claimed_by=token)
+            try:
+                sent += connection.send_messages(
+                    digest_messages(claimed)) or 0
+            except Exception:
+                claimed.update(claimed_by="", claimed_at=None)
+                raise
+            claimed.delete()
+            throttle(started, sent)
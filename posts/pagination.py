@@ -0,0 +1,245 @@
+import base64
+import binascii
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Max, Min, Q, QuerySet, prefetch_related_objects
+from django.utils.dateparse import parse_datetime
+
+CURSOR_PARAM = "cursor"
+PAGE_PARAM = "page"
+CURSOR_NEXT = "n"
+CURSOR_PREVIOUS = "p"
+PAGE_RANGE_ON_EACH_SIDE = 2
+PAGE_RANGE_ON_ENDS = 1
+
+
+def key_value(obj, key):
+    """Значение ключа у объекта модели или у строки из values()."""
+    if isinstance(obj, dict):
+        return obj["id" if key == "pk" else key]
+    return getattr(obj, key)
+
+
+def encode_cursor(obj, direction, key="pub_date"):
+    """Непрозрачный курсор из ключа (key, id) объекта."""
+    value = key_value(obj, key)
+    if hasattr(value, "isoformat"):
+        value = value.isoformat()
+    raw = f"{direction}|{value}|{key_value(obj, 'pk')}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, parse=parse_datetime):
+    """Разбор курсора; для некорректного значения возвращает None."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        direction, value, pk = raw.split("|")
+        value = parse(value)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS) or value is None:
+        return None
+    return direction, value, pk
+
+
+class CursorPage:
+    """Страница ленты, выбранная по курсору, а не по номеру."""
+    is_cursor = True
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f"<CursorPage of {len(self.object_list)} items>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Пагинатор по ключу (key, id), по умолчанию (pub_date, id) по убыванию.
+
+    В отличие от Paginator не выполняет COUNT(*) и OFFSET: каждая страница
+    выбирается условием по ключу последнего показанного объекта. Ключом
+    может быть поле даты или сам первичный ключ "pk".
+    """
+    def __init__(self, object_list, per_page, key="pub_date",
+                 descending=True):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.key = key
+        self.descending = descending
+
+    def decode(self, cursor):
+        parse = int if self.key == "pk" else parse_datetime
+        return decode_cursor(cursor, parse) if cursor else None
+
+    def get_page(self, cursor):
+        """Страница по курсору; пустой или неверный курсор — первая."""
+        position = self.decode(cursor)
+        if position is None:
+            return self._page_after(None)
+        direction, value, pk = position
+        if direction == CURSOR_PREVIOUS:
+            return self._page_before((value, pk))
+        return self._page_after((value, pk))
+
+    def _seek(self, descending, position):
+        """Объекты, идущие после position в заданном порядке."""
+        prefix = "-" if descending else ""
+        queryset = self.object_list.order_by(prefix + self.key, prefix + "pk")
+        if position is None:
+            return queryset
+        value, pk = position
+        lookup = "lt" if descending else "gt"
+        return queryset.filter(
+            Q(**{f"{self.key}__{lookup}": value})
+            | Q(**{self.key: value, f"pk__{lookup}": pk}))
+
+    def iter_page(self, cursor):
+        """
+        Потоковый вариант get_page для перехода вперед.
+
+        Генератор отдает объекты страницы по одному, не кэшируя их
+        в QuerySet, и возвращает курсор следующей страницы или None.
+        """
+        position = self.decode(cursor)
+        if position is not None:
+            position = position[1:]
+        rows = self._seek(self.descending, position)[:self.per_page + 1]
+        last = None
+        for count, obj in enumerate(rows.iterator(), 1):
+            if count > self.per_page:
+                return encode_cursor(last, CURSOR_NEXT, self.key)
+            last = obj
+            yield obj
+        return None
+
+    def _position(self, obj):
+        return key_value(obj, self.key), key_value(obj, "pk")
+
+    def _fetch(self, queryset):
+        """
+        Список из per_page + 1 объектов выборки одним запросом.
+
+        Лишний объект только показывает, есть ли следующая страница,
+        поэтому prefetch_related выполняется для объектов страницы.
+        """
+        lookups = getattr(queryset, "_prefetch_related_lookups", ())
+        rows = list(queryset.prefetch_related(None)[:self.per_page + 1])
+        prefetch_related_objects(rows[:self.per_page], *lookups)
+        return rows
+
+    def _page_after(self, position):
+        items = self._fetch(self._seek(self.descending, position))
+        has_next = len(items) > self.per_page
+        items = items[:self.per_page]
+        return self._make_page(items, has_next, position is not None)
+
+    def _page_before(self, position):
+        items = self._fetch(self._seek(not self.descending, position))
+        has_previous = len(items) > self.per_page
+        items = items[:self.per_page][::-1]
+        return self._make_page(items, True, has_previous)
+
+    def _make_page(self, items, has_next, has_previous):
+        objects = list(items)
+        next_cursor = previous_cursor = None
+        if objects and has_next:
+            next_cursor = encode_cursor(objects[-1], CURSOR_NEXT, self.key)
+        if objects and has_previous:
+            previous_cursor = encode_cursor(
+                objects[0], CURSOR_PREVIOUS, self.key)
+        return CursorPage(items, next_cursor, previous_cursor)
+
+
+def use_cursor(request):
+    """Выбор режима пагинации для запроса."""
+    if CURSOR_PARAM in request.GET:
+        return True
+    if PAGE_PARAM in request.GET:
+        return False
+    return getattr(settings, "FEED_PAGINATION", "page") == "cursor"
+
+
+def page_window(number, num_pages, on_each_side=PAGE_RANGE_ON_EACH_SIDE,
+                on_ends=PAGE_RANGE_ON_ENDS):
+    """
+    Номера страниц для ссылок: первые и последние on_ends страниц
+    и on_each_side страниц вокруг текущей. Пропуски обозначаются None.
+    """
+    window = range(max(number - on_each_side, 1),
+                   min(number + on_each_side, num_pages) + 1)
+    numbers = sorted(set(window) | set(range(1, min(on_ends, num_pages) + 1))
+                     | set(range(max(num_pages - on_ends + 1, 1),
+                                 num_pages + 1)))
+    result = []
+    for i in numbers:
+        if result and i - result[-1] > 1:
+            result.append(None)
+        result.append(i)
+    return result
+
+
+def estimated_count(object_list):
+    """
+    Оценка числа публикаций без COUNT(*) или None.
+
+    Оценка — разность наибольшего и наименьшего ключа, два шага по
+    первичному индексу; после удалений она завышена. Применяется только
+    к выборкам без фильтров и только когда оценка не меньше
+    FEED_COUNT_ESTIMATE_THRESHOLD: на небольших таблицах точный подсчет
+    дешев.
+    """
+    threshold = getattr(settings, "FEED_COUNT_ESTIMATE_THRESHOLD", None)
+    if (not threshold or not isinstance(object_list, QuerySet)
+            or object_list.query.where):
+        return None
+    bounds = object_list.model._default_manager.using(
+        object_list.db).aggregate(first=Min("pk"), last=Max("pk"))
+    if bounds["last"] is None:
+        return None
+    estimate = bounds["last"] - bounds["first"] + 1
+    return estimate if estimate >= threshold else None
+
+
+def paginate(request, object_list, per_page, count=None):
+    """
+    Контекст постраничного вывода ленты.
+
+    Режим по курсору включается параметром ?cursor= или настройкой
+    FEED_PAGINATION = "cursor"; иначе используется Paginator по номеру
+    страницы. Число записей для него дает функция count, если она
+    передана; иначе на больших таблицах оно оценивается, estimated_count.
+    """
+    if use_cursor(request):
+        paginator = CursorPaginator(object_list, per_page)
+        page = paginator.get_page(request.GET.get(CURSOR_PARAM))
+    else:
+        paginator = Paginator(object_list, per_page)
+        total = count() if count else estimated_count(object_list)
+        if total is not None:
+            paginator.count = total
+        page = paginator.get_page(request.GET.get(PAGE_PARAM))
+    return {"page": page, "paginator": paginator}
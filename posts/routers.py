@@ -0,0 +1,100 @@
+"""
+Чтение лент с реплики базы данных.
+
+View-функции лент, обернутые в replica_reads, читают из псевдонима
+DATABASE_REPLICA, все записи идут в default. После изменяющего запроса
+пользователь получает cookie (ReplicaPinMiddleware), и его чтения
+в течение DATABASE_REPLICA_PIN_SECONDS идут в default, чтобы не увидеть
+реплику, отстающую от основной базы.
+"""
+import threading
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = "db_primary"
+
+_state = threading.local()
+
+
+def replica_alias():
+    """
+    Псевдоним реплики или None, если ее нет.
+
+    Реплика, указывающая на ту же базу, что и default (разработка или
+    тестовое зеркало), не используется: лишнее соединение ничего не дает.
+    """
+    alias = getattr(settings, "DATABASE_REPLICA", None)
+    if alias not in connections.databases:
+        return None
+    replica = connections[alias].settings_dict
+    primary = connections[DEFAULT_DB_ALIAS].settings_dict
+    if (replica["ENGINE"], replica["NAME"]) == (
+            primary["ENGINE"], primary["NAME"]):
+        return None
+    return alias
+
+
+def primary_alias():
+    """
+    Псевдоним основной базы для чтений, которым нужна свежая запись.
+
+    В отличие от router.db_for_write, не отмечает запрос записавшим:
+    такое чтение не переключает остаток запроса и следующие запросы
+    пользователя на основную базу.
+    """
+    return DEFAULT_DB_ALIAS
+
+
+def pin_seconds():
+    return getattr(settings, "DATABASE_REPLICA_PIN_SECONDS", 10)
+
+
+def is_pinned(request):
+    return PIN_COOKIE in request.COOKIES
+
+
+def begin_request():
+    _state.use_replica = False
+    _state.wrote = False
+
+
+def request_wrote():
+    """
+    Обращался ли текущий запрос к базе для записи.
+
+    После этого запрос до конца читает из default, чтобы видеть
+    собственные изменения.
+    """
+    return getattr(_state, "wrote", False)
+
+
+def replica_reads(view):
+    """Декоратор view: чтения во время ее работы идут на реплику."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if is_pinned(request):
+            return view(request, *args, **kwargs)
+        _state.use_replica = True
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _state.use_replica = False
+    return wrapper
+
+
+class ReplicaRouter:
+    """Маршрутизатор: чтения лент — на реплику, остальное — в default."""
+
+    def db_for_read(self, model, **hints):
+        if getattr(_state, "use_replica", False) and not request_wrote():
+            return replica_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
@@ -0,0 +1,181 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .models import Comment, Post
+from .sqlite import checkpoint
+from .stemmer import stem_text
+
+SEARCH_TABLE = "posts_search"
+
+
+def document_rowid(kind, object_id):
+    """rowid документа индекса: посты четные, комментарии нечетные."""
+    return object_id * 2 + (kind == "comment")
+
+
+class BaseSearchBackend:
+    """
+    Интерфейс поискового индекса.
+
+    Индекс хранит документы постов и комментариев; поиск возвращает
+    id постов, упорядоченные по релевантности.
+    """
+
+    def index_post(self, post):
+        pass
+
+    def remove_post(self, post_id):
+        pass
+
+    def index_comment(self, comment):
+        pass
+
+    def remove_comment(self, comment_id):
+        pass
+
+    def clear(self):
+        pass
+
+    def index_all(self, batch_size):
+        """Индексирует все посты и комментарии в пустой индекс."""
+        posts = Post.objects.only("text")
+        for post in posts.iterator(chunk_size=batch_size):
+            self.index_post(post)
+        comments = Comment.objects.only("post_id", "text")
+        for comment in comments.iterator(chunk_size=batch_size):
+            self.index_comment(comment)
+
+    def search(self, query, limit):
+        raise NotImplementedError
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """Поиск без индекса через LIKE; подходит для любой базы."""
+
+    def search(self, query, limit):
+        words = query.split()
+        if not words:
+            return []
+        condition = Q()
+        for word in words:
+            condition &= (Q(text__icontains=word)
+                          | Q(post_comments__text__icontains=word))
+        return list(Post.objects.filter(condition).values_list(
+            "pk", flat=True).distinct()[:limit])
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """
+    Индекс на виртуальной таблице SQLite FTS5.
+
+    В таблицу записываются основы слов, поэтому запрос находит все
+    словоформы; результаты ранжируются по bm25.
+    """
+
+    def _write(self, kind, object_id, post_id, text):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT OR REPLACE INTO {SEARCH_TABLE} "
+                f"(rowid, post_id, body) VALUES (%s, %s, %s)",
+                [document_rowid(kind, object_id), post_id,
+                 " ".join(stem_text(text))])
+
+    def _delete(self, kind, object_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s",
+                [document_rowid(kind, object_id)])
+
+    def index_post(self, post):
+        self._write("post", post.pk, post.pk, post.text)
+
+    def remove_post(self, post_id):
+        self._delete("post", post_id)
+
+    def index_comment(self, comment):
+        self._write("comment", comment.pk, comment.post_id, comment.text)
+
+    def remove_comment(self, comment_id):
+        self._delete("comment", comment_id)
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+
+    def index_all(self, batch_size):
+        index_documents(
+            connection, Post.objects.all(), Comment.objects.all(),
+            batch_size)
+
+    def search(self, query, limit):
+        terms = [f'"{term}"*' for term in stem_text(query)]
+        if not terms:
+            return []
+        post_ids = {}
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT post_id FROM {SEARCH_TABLE} "
+                f"WHERE {SEARCH_TABLE} MATCH %s ORDER BY rank",
+                [" ".join(terms)])
+            while len(post_ids) < limit:
+                rows = cursor.fetchmany(limit)
+                if not rows:
+                    break
+                for (post_id,) in rows:
+                    post_ids.setdefault(post_id, None)
+        return list(post_ids)[:limit]
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    """Поисковый бэкенд из настройки SEARCH_BACKEND."""
+    return import_string(settings.SEARCH_BACKEND)()
+
+
+def search_posts(query):
+    """id постов, найденных по запросу, в порядке релевантности."""
+    return get_backend().search(query, settings.SEARCH_MAX_RESULTS)
+
+
+def index_documents(connection, posts, comments, batch_size=1000):
+    """
+    Записывает в таблицу FTS5 документы постов и комментариев.
+
+    posts и comments — выборки моделей Post и Comment, в том числе
+    исторических моделей миграций. Документы читаются пачками по
+    batch_size по возрастанию ключа, без открытого курсора, и каждая пачка
+    пишется одним executemany в своей транзакции, после которой журнал
+    WAL переносится в базу.
+    """
+    sql = (f"INSERT OR REPLACE INTO {SEARCH_TABLE} "
+           f"(rowid, post_id, body) VALUES (%s, %s, %s)")
+    sources = (
+        ("post", posts.values_list("pk", "pk", "text")),
+        ("comment", comments.values_list("pk", "post_id", "text")),
+    )
+    for kind, rows in sources:
+        last_pk = 0
+        while True:
+            batch = list(rows.filter(pk__gt=last_pk).order_by(
+                "pk")[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            documents = [
+                (document_rowid(kind, pk), post_id, " ".join(stem_text(text)))
+                for pk, post_id, text in batch]
+            with transaction.atomic(using=connection.alias), \
+                    connection.cursor() as cursor:
+                cursor.executemany(sql, documents)
+            checkpoint(connection)
+
+
+def rebuild_index(batch_size=1000):
+    """Переиндексирует все посты и комментарии."""
+    backend = get_backend()
+    backend.clear()
+    backend.index_all(batch_size)
@@ -0,0 +1,266 @@
+"""
+Синтетические данные для нагрузочных замеров.
+
+Активность авторов подчиняется степенному закону: у немногих авторов
+большая часть постов и подписчиков, комментарии чаще достаются свежим
+постам. Все случайные величины берутся из random.Random(seed), поэтому
+одинаковые параметры дают одинаковые данные. Пользователи и группы
+создаются через bulk_create, а посты, комментарии и подписки — готовыми
+кортежами через executemany, без объектов моделей и сигналов; производные
+таблицы (счетчики, ленты, поисковый индекс) пересчитываются отдельно,
+rebuild_derived.
+"""
+import datetime
+import random
+from io import BytesIO, StringIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.color import no_style
+from django.db import connections, router, transaction
+from django.db.models import DateTimeField, Max
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from .cache import invalidate_feeds, invalidate_pages, reset_counts
+from .feeds import rebuild_timelines
+from .models import Comment, Follow, Group, Post, User
+from .search import rebuild_index
+
+BATCH_SIZE = 5000
+QUERY_BATCH_SIZE = 500
+AUTHOR_SKEW = 3
+COMMENT_SKEW = 4
+NO_GROUP_SHARE = 0.3
+IMAGE_POOL_SIZE = 16
+IMAGE_SIZE = (960, 640)
+PERIOD = datetime.timedelta(days=365)
+WORDS = (
+    "пост новости город погода кот собака книга фильм музыка лето зима "
+    "утро вечер дорога море лес работа друзья праздник идея вопрос ответ "
+    "история фото путешествие кофе код проект выходные планы"
+).split()
+
+
+def skewed_index(rng, size, skew):
+    """
+    Индекс от 0 до size - 1, распределенный по степенному закону.
+
+    Вероятность индекса убывает как степень его номера, так что малые
+    индексы выпадают гораздо чаще больших.
+    """
+    return min(size - 1, int(size * rng.random() ** skew))
+
+
+def words(rng, low, high):
+    return " ".join(rng.choices(WORDS, k=rng.randint(low, high)))
+
+
+def batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def bulk_insert(model, objects, batch_size, ignore_conflicts=False):
+    """Вставка пачками, каждая пачка — в своей транзакции."""
+    for batch in batched(objects, batch_size):
+        with transaction.atomic():
+            model.objects.bulk_create(batch, ignore_conflicts=ignore_conflicts)
+
+
+def insert_rows(model, fields, rows, batch_size, ignore_conflicts=False):
+    """
+    Вставка кортежей значений полей fields пачками через executemany.
+
+    Значения передаются в базу как есть, только даты приводятся
+    к формату базы. Каждая пачка — в своей транзакции.
+    """
+    using = router.db_for_write(model)
+    connection = connections[using]
+    ops = connection.ops
+    fields = [model._meta.get_field(name) for name in fields]
+    sql = "%s %s (%s) VALUES (%s)%s" % (
+        ops.insert_statement(ignore_conflicts=ignore_conflicts),
+        ops.quote_name(model._meta.db_table),
+        ", ".join(ops.quote_name(field.column) for field in fields),
+        ", ".join(["%s"] * len(fields)),
+        ops.ignore_conflicts_suffix_sql(ignore_conflicts=ignore_conflicts))
+    dates = [index for index, field in enumerate(fields)
+             if isinstance(field, DateTimeField)]
+    for batch in batched(rows, batch_size):
+        if dates:
+            batch = [list(row) for row in batch]
+            for row in batch:
+                for index in dates:
+                    row[index] = ops.adapt_datetimefield_value(row[index])
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.executemany(sql, batch)
+
+
+def existing_ids(model, field, values):
+    """Ключи объектов model, у которых field принимает значения values."""
+    ids = []
+    for batch in batched(values, QUERY_BATCH_SIZE):
+        ids += model.objects.filter(**{f"{field}__in": batch}).values_list(
+            "pk", flat=True)
+    return sorted(ids)
+
+
+def reset_sequences():
+    """
+    Сдвигает последовательность ключей постов за последний ключ.
+
+    Посты вставляются с явными pk; базы с последовательностями (PostgreSQL)
+    иначе выдали бы следующему посту уже занятый ключ. В SQLite ничего
+    не делает.
+    """
+    connection = connections[router.db_for_write(Post)]
+    statements = connection.ops.sequence_reset_sql(no_style(), [Post])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def make_images(rng, prefix):
+    """Небольшой набор сгенерированных изображений для постов."""
+    names = []
+    for number in range(IMAGE_POOL_SIZE):
+        color = tuple(rng.randrange(256) for _ in range(3))
+        image = Image.new("RGB", IMAGE_SIZE, color)
+        draw = ImageDraw.Draw(image)
+        for _ in range(8):
+            box = sorted(rng.randrange(IMAGE_SIZE[0]) for _ in range(2))
+            rows = sorted(rng.randrange(IMAGE_SIZE[1]) for _ in range(2))
+            draw.rectangle(
+                (box[0], rows[0], box[1], rows[1]),
+                fill=tuple(rng.randrange(256) for _ in range(3)))
+        buffer = BytesIO()
+        image.save(buffer, "JPEG", quality=80)
+        names.append(default_storage.save(
+            f"posts/{prefix}-{number}.jpg", ContentFile(buffer.getvalue())))
+    return names
+
+
+def generate(users, groups, posts, comments, follows, seed=0, images=0.0,
+             prefix="seed", batch_size=BATCH_SIZE, log=None):
+    """
+    Создает пользователей, группы, посты, комментарии и подписки.
+
+    images — доля постов с изображением. Имена пользователей и slug групп
+    строятся из prefix; уже существующие пользователи и группы с такими
+    именами не создаются заново, а используются. Новые посты получают
+    ключи подряд после последнего существующего. Повторяющиеся подписки
+    пропускаются.
+    Возвращает число созданных объектов каждого вида.
+    """
+    rng = random.Random(seed)
+    log = log or (lambda message: None)
+    bulk_insert(User, (
+        User(username=f"{prefix}{i}", first_name=f"Автор {i}")
+        for i in range(users)), batch_size, ignore_conflicts=True)
+    user_ids = existing_ids(
+        User, "username", [f"{prefix}{i}" for i in range(users)])
+    rng.shuffle(user_ids)
+    log(f"Пользователи: {len(user_ids)}")
+
+    bulk_insert(Group, (
+        Group(title=f"Группа {i}", slug=f"{prefix}-group-{i}",
+              description=words(rng, 5, 30))
+        for i in range(groups)), batch_size, ignore_conflicts=True)
+    group_ids = existing_ids(
+        Group, "slug", [f"{prefix}-group-{i}" for i in range(groups)])
+    log(f"Группы: {len(group_ids)}")
+
+    image_names = make_images(rng, prefix) if images and posts else []
+    now = timezone.now()
+    start = now - PERIOD
+    step = PERIOD / max(posts, 1)
+    first_post_id = (Post.objects.aggregate(last=Max("pk"))["last"] or 0) + 1
+
+    def pub_date(index):
+        return start + step * index
+
+    def new_posts():
+        for i in range(posts):
+            image = ""
+            if image_names and rng.random() < images:
+                image = rng.choice(image_names)
+            group_id = None
+            if group_ids and rng.random() >= NO_GROUP_SHARE:
+                group_id = group_ids[skewed_index(rng, len(group_ids), 2)]
+            yield (
+                first_post_id + i,
+                words(rng, 3, 60),
+                pub_date(i),
+                user_ids[skewed_index(rng, len(user_ids), AUTHOR_SKEW)],
+                group_id,
+                image,
+                "")
+
+    def new_comments():
+        for _ in range(comments):
+            index = posts - 1 - skewed_index(rng, posts, COMMENT_SKEW)
+            created = pub_date(index) + step * rng.random() * 50
+            yield (
+                words(rng, 1, 20),
+                first_post_id + index,
+                rng.choice(user_ids),
+                min(created, now))
+
+    def new_follows():
+        for _ in range(follows):
+            user_id = rng.choice(user_ids)
+            author_id = user_ids[
+                skewed_index(rng, len(user_ids), AUTHOR_SKEW)]
+            if user_id != author_id:
+                yield user_id, author_id
+
+    insert_rows(
+        Post, ("id", "text", "pub_date", "author", "group", "image",
+               "thumbnail"),
+        new_posts(), batch_size)
+    log(f"Посты: {posts}")
+    if posts:
+        insert_rows(
+            Comment, ("text", "post", "author", "created"),
+            new_comments(), batch_size)
+    log(f"Комментарии: {comments if posts else 0}")
+    follows_before = Follow.objects.count()
+    if len(user_ids) > 1:
+        insert_rows(
+            Follow, ("user", "author"), new_follows(), batch_size,
+            ignore_conflicts=True)
+    reset_sequences()
+    follows_created = Follow.objects.count() - follows_before
+    log(f"Подписки: {follows_created}")
+    return {
+        "users": len(user_ids),
+        "groups": len(group_ids),
+        "posts": posts,
+        "comments": comments if posts else 0,
+        "follows": follows_created,
+    }
+
+
+def rebuild_derived(timelines=True, search_index=True):
+    """
+    Пересчитывает счетчики авторов, ленты подписок и поисковый индекс.
+
+    Ленты и индекс — самые долгие части; их можно не строить, если
+    замерам они не нужны.
+    """
+    call_command("recount_author_stats", stdout=StringIO())
+    if timelines:
+        rebuild_timelines()
+    if search_index:
+        rebuild_index()
+    invalidate_feeds()
+    invalidate_pages()
+    reset_counts()
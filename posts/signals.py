@@ -0,0 +1,210 @@
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import (change_counts, forget_groups, invalidate_feeds,
+                    post_page_names, touch_pages)
+from .feeds import (backfill_timeline, fan_out_post, follower_lost,
+                    prune_timeline)
+from .follow_graph import forget_follows
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+from .search import get_backend
+from .sqlite import apply_pragmas
+
+
+def change_counter(user_id, field, delta):
+    """
+    Изменяет счетчик пользователя на delta.
+
+    При увеличении отсутствующая запись создается с точными значениями;
+    при уменьшении ничего не создается, так как пользователь может
+    удаляться каскадом в той же транзакции.
+    """
+    if user_id is None:
+        return
+    stats = AuthorStats.objects.filter(user_id=user_id)
+    if delta < 0:
+        stats = stats.filter(**{f"{field}__gte": -delta})
+    updated = stats.update(**{field: F(field) + delta})
+    if not updated and delta > 0:
+        AuthorStats.objects.for_user(User(pk=user_id))
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, **kwargs):
+    if created:
+        change_counter(instance.author_id, "posts_count", 1)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    change_counter(instance.author_id, "posts_count", -1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        change_counter(instance.author_id, "comments_count", 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    change_counter(instance.author_id, "comments_count", -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        change_counter(instance.author_id, "followers_count", 1)
+        change_counter(instance.user_id, "following_count", 1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    change_counter(instance.author_id, "followers_count", -1)
+    change_counter(instance.user_id, "following_count", -1)
+
+
+@receiver(post_save, sender=Post)
+def post_fan_out(sender, instance, created, **kwargs):
+    if created:
+        fan_out_post(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_backfill(sender, instance, created, **kwargs):
+    if created and instance.user_id is not None:
+        backfill_timeline(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_prune(sender, instance, **kwargs):
+    if instance.user_id is not None:
+        prune_timeline(instance.user_id, instance.author_id)
+    follower_lost(instance.author_id)
+
+
+def post_count_names(author_id, group_id):
+    """Счетчики лент, в которые входит публикация."""
+    names = ["posts", f"author:{author_id}"]
+    if group_id is not None:
+        names.append(f"group:{group_id}")
+    return names
+
+
+@receiver(pre_save, sender=Post)
+def post_moved(sender, instance, update_fields=None, **kwargs):
+    if instance._state.adding or (
+            update_fields is not None and "group" not in update_fields):
+        return
+    old_group_id = Post.objects.filter(pk=instance.pk).values_list(
+        "group_id", flat=True).first()
+    if old_group_id != instance.group_id:
+        if old_group_id is not None:
+            change_counts([f"group:{old_group_id}"], -1)
+            touch_pages([f"group:{old_group_id}"])
+        if instance.group_id is not None:
+            change_counts([f"group:{instance.group_id}"], 1)
+
+
+@receiver(post_save, sender=Post)
+def post_counted(sender, instance, created, **kwargs):
+    if created:
+        change_counts(
+            post_count_names(instance.author_id, instance.group_id), 1)
+
+
+@receiver(post_delete, sender=Post)
+def post_uncounted(sender, instance, **kwargs):
+    change_counts(
+        post_count_names(instance.author_id, instance.group_id), -1)
+
+
+@receiver(pre_save, sender=Group)
+def group_renamed(sender, instance, **kwargs):
+    if instance.pk is not None:
+        forget_groups(*Group.objects.filter(pk=instance.pk).values_list(
+            "slug", flat=True))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    forget_groups(instance.slug)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_graph_changed(sender, instance, **kwargs):
+    forget_follows([(instance.user_id, instance.author_id)])
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def feed_changed(sender, **kwargs):
+    invalidate_feeds()
+
+
+def usernames(*user_ids):
+    return User.objects.filter(pk__in=user_ids).values_list(
+        "username", flat=True)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_pages_changed(sender, instance, **kwargs):
+    for username in usernames(instance.author_id):
+        touch_pages(post_page_names(
+            instance.pk, username, instance.group_id))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_pages_changed(sender, instance, **kwargs):
+    touch_pages(["comments", f"post:{instance.post_id}"])
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_pages_changed(sender, instance, **kwargs):
+    touch_pages(["groups"])
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_pages_changed(sender, instance, **kwargs):
+    touch_pages([
+        f"author:{username}"
+        for username in usernames(instance.user_id, instance.author_id)])
+
+
+@receiver(post_save, sender=Post)
+def post_indexed(sender, instance, **kwargs):
+    get_backend().index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_unindexed(sender, instance, **kwargs):
+    get_backend().remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def comment_indexed(sender, instance, **kwargs):
+    get_backend().index_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_unindexed(sender, instance, **kwargs):
+    get_backend().remove_comment(instance.pk)
+
+
+@receiver(connection_created)
+def connection_pragmas(sender, connection, **kwargs):
+    apply_pragmas(connection)
@@ -0,0 +1,43 @@
+"""
+Настройка соединений SQLite.
+
+PRAGMA из SQLITE_PRAGMAS выполняются для каждого нового соединения:
+журнал WAL позволяет читать во время записи, busy_timeout заставляет
+писателя ждать блокировку, а не падать с "database is locked".
+"""
+from django.conf import settings
+
+DEFAULT_PRAGMAS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "busy_timeout": 5000,
+}
+
+
+def sqlite_pragmas():
+    return getattr(settings, "SQLITE_PRAGMAS", DEFAULT_PRAGMAS)
+
+
+def apply_pragmas(connection, pragmas=None):
+    """Выполняет PRAGMA для соединения SQLite; другие базы пропускает."""
+    if connection.vendor != "sqlite":
+        return
+    if pragmas is None:
+        pragmas = sqlite_pragmas()
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def checkpoint(connection):
+    """
+    Переносит журнал WAL в файл базы и обрезает журнал.
+
+    Нужен между транзакциями массовой записи, иначе журнал растет
+    до объема всех записанных страниц. Внутри транзакции и для других
+    баз ничего не делает.
+    """
+    if connection.vendor != "sqlite" or connection.in_atomic_block:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
@@ -0,0 +1,148 @@
+"""
+Стеммер русского языка по алгоритму Snowball (Портера).
+
+Используется поиском: одни и те же основы слов записываются в индекс
+и извлекаются из поискового запроса.
+"""
+import re
+from functools import lru_cache
+
+VOWELS = "аеиоуыэюя"
+
+PERFECTIVE_GERUND = (
+    ("в", "вши", "вшись"),
+    ("ив", "ивши", "ившись", "ыв", "ывши", "ывшись"),
+)
+ADJECTIVE = (
+    (),
+    ("ее", "ие", "ые", "ое", "ими", "ыми", "ей", "ий", "ый", "ой", "ем",
+     "им", "ым", "ом", "его", "ого", "ему", "ому", "их", "ых", "ую", "юю",
+     "ая", "яя", "ою", "ею"),
+)
+PARTICIPLE = (
+    ("ем", "нн", "вш", "ющ", "щ"),
+    ("ивш", "ывш", "ующ"),
+)
+REFLEXIVE = (
+    (),
+    ("ся", "сь"),
+)
+VERB = (
+    ("ла", "на", "ете", "йте", "ли", "й", "л", "ем", "н", "ло", "но", "ет",
+     "ют", "ны", "ть", "ешь", "нно"),
+    ("ила", "ыла", "ена", "ейте", "уйте", "ите", "или", "ыли", "ей", "уй",
+     "ил", "ыл", "им", "ым", "ен", "ило", "ыло", "ено", "ят", "ует", "уют",
+     "ит", "ыт", "ены", "ить", "ыть", "ишь", "ую", "ю"),
+)
+NOUN = (
+    (),
+    ("а", "ев", "ов", "ие", "ье", "е", "иями", "ями", "ами", "еи", "ии", "и",
+     "ией", "ей", "ой", "ий", "й", "иям", "ям", "ием", "ем", "ам", "ом", "о",
+     "у", "ах", "иях", "ях", "ы", "ь", "ию", "ью", "ю", "ия", "ья", "я"),
+)
+SUPERLATIVE = ("ейше", "ейш")
+DERIVATIONAL = ("ость", "ост")
+
+WORD_RE = re.compile(r"\w+")
+
+
+def _suffixes(groups):
+    """
+    Окончания группы от длинных к коротким.
+
+    Окончания первой подгруппы допустимы только после «а» или «я».
+    """
+    after_a, plain = groups
+    pairs = [(suffix, True) for suffix in after_a]
+    pairs += [(suffix, False) for suffix in plain]
+    return sorted(pairs, key=lambda pair: len(pair[0]), reverse=True)
+
+
+PERFECTIVE_GERUND = _suffixes(PERFECTIVE_GERUND)
+ADJECTIVE = _suffixes(ADJECTIVE)
+PARTICIPLE = _suffixes(PARTICIPLE)
+REFLEXIVE = _suffixes(REFLEXIVE)
+VERB = _suffixes(VERB)
+NOUN = _suffixes(NOUN)
+
+
+def _strip(rv, suffixes):
+    """Отрезает самое длинное подходящее окончание; None, если его нет."""
+    for suffix, after_a in suffixes:
+        if not rv.endswith(suffix):
+            continue
+        stem = rv[:-len(suffix)]
+        if after_a and not stem.endswith(("а", "я")):
+            continue
+        return stem
+    return None
+
+
+def _region(word):
+    """Часть слова после первого сочетания гласной и согласной."""
+    for i in range(1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return word[i + 1:]
+    return ""
+
+
+@lru_cache(maxsize=100000)
+def stem(word):
+    """
+    Основа русского слова.
+
+    Основы запоминаются: в текстах слова повторяются, и при построении
+    индекса большинство из них уже разобрано.
+    """
+    word = word.lower().replace("ё", "е")
+    for i, letter in enumerate(word):
+        if letter in VOWELS:
+            prefix, rv = word[:i + 1], word[i + 1:]
+            break
+    else:
+        return word
+
+    stripped = _strip(rv, PERFECTIVE_GERUND)
+    if stripped is None:
+        reflexive = _strip(rv, REFLEXIVE)
+        if reflexive is not None:
+            rv = reflexive
+        stripped = _strip(rv, ADJECTIVE)
+        if stripped is not None:
+            participle = _strip(stripped, PARTICIPLE)
+            if participle is not None:
+                stripped = participle
+        else:
+            stripped = _strip(rv, VERB)
+            if stripped is None:
+                stripped = _strip(rv, NOUN)
+    if stripped is not None:
+        rv = stripped
+
+    if rv.endswith("и"):
+        rv = rv[:-1]
+
+    r2 = _region(_region(prefix + rv))
+    for suffix in DERIVATIONAL:
+        if r2.endswith(suffix):
+            rv = rv[:-len(suffix)]
+            break
+
+    if rv.endswith("нн"):
+        rv = rv[:-1]
+    else:
+        for suffix in SUPERLATIVE:
+            if rv.endswith(suffix):
+                rv = rv[:-len(suffix)]
+                if rv.endswith("нн"):
+                    rv = rv[:-1]
+                break
+        else:
+            if rv.endswith("ь"):
+                rv = rv[:-1]
+    return prefix + rv
+
+
+def stem_text(text):
+    """Основы всех слов текста в исходном порядке."""
+    return [stem(word) for word in WORD_RE.findall(text)]
@@ -0,0 +1,189 @@
+"""
+Очередь фоновых задач в базе данных.
+
+enqueue записывает вызов в таблицу Task в текущей транзакции: исполнитель
+увидит задачу только после ее фиксации, вместе с данными, которые задача
+обрабатывает. Исполнители (команда run_tasks) забирают задачи условным
+UPDATE, поэтому очередь работает на любой базе, включая SQLite без
+SELECT ... FOR UPDATE SKIP LOCKED. Упавшая задача повторяется с растущей
+задержкой; задача, взятая исполнителем и не завершенная за
+TASK_LOCK_TIMEOUT секунд, считается брошенной и берется заново.
+Выполненные задачи удаляются, окончательно упавшие остаются в таблице.
+"""
+import datetime
+import json
+import logging
+import threading
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+
+def task(func):
+    """Декоратор: функцию можно ставить в очередь по ее полному имени."""
+    func.task_name = f"{func.__module__}.{func.__name__}"
+    return func
+
+
+def resolve(name):
+    func = import_string(name)
+    if getattr(func, "task_name", None) != name:
+        raise ValueError(f"{name} не помечена как фоновая задача")
+    return func
+
+
+def enqueue(func, *args, delay=0):
+    """
+    Ставит вызов func(*args) в очередь; аргументы должны быть JSON.
+
+    Задача выполняется не раньше чем через delay секунд. При
+    TASKS_EAGER = True она выполняется в этом же процессе сразу после
+    фиксации транзакции, без задержки.
+    """
+    if settings.TASKS_EAGER:
+        transaction.on_commit(lambda: call(func.task_name, args))
+        return None
+    return Task.objects.create(
+        name=func.task_name,
+        args=json.dumps(args),
+        run_at=timezone.now() + datetime.timedelta(seconds=delay),
+        max_attempts=settings.TASK_MAX_ATTEMPTS)
+
+
+def call(name, args):
+    """Выполняет задачу; ошибку записывает в журнал и возвращает."""
+    try:
+        resolve(name)(*args)
+    except Exception as error:
+        logger.exception("Фоновая задача %s%s упала", name, args)
+        return error
+    return None
+
+
+def ready_tasks(now):
+    """Задачи, которые можно взять: ждущие и брошенные исполнителями."""
+    abandoned = now - datetime.timedelta(seconds=settings.TASK_LOCK_TIMEOUT)
+    return Task.objects.filter(
+        Q(status=Task.PENDING, run_at__lte=now)
+        | Q(status=Task.RUNNING, locked_at__lt=abandoned))
+
+
+def claim(candidates=10):
+    """
+    Забирает одну задачу или возвращает None.
+
+    Среди первых candidates готовых задач берется первая, которую удалось
+    перевести в RUNNING условным UPDATE: если ее успел забрать другой
+    исполнитель, обновится ноль строк и проверяется следующая.
+    """
+    now = timezone.now()
+    ready = ready_tasks(now)
+    pks = list(ready.order_by("run_at", "pk").values_list(
+        "pk", flat=True)[:candidates])
+    token = uuid.uuid4().hex
+    for pk in pks:
+        claimed = ready_tasks(now).filter(pk=pk).update(
+            status=Task.RUNNING,
+            locked_by=token,
+            locked_at=now,
+            attempts=F("attempts") + 1)
+        if claimed:
+            return Task.objects.get(pk=pk)
+    return None
+
+
+def retry_delay(attempts):
+    """Задержка перед повтором: TASK_RETRY_DELAY, удваиваясь с попыткой."""
+    return datetime.timedelta(
+        seconds=settings.TASK_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def run(task_row):
+    """
+    Выполняет взятую задачу.
+
+    Выполненная задача удаляется; упавшая возвращается в очередь
+    с задержкой или, если попытки кончились, помечается FAILED.
+    """
+    mine = Task.objects.filter(pk=task_row.pk, locked_by=task_row.locked_by)
+    if task_row.attempts <= task_row.max_attempts:
+        error = call(task_row.name, json.loads(task_row.args))
+        if error is None:
+            mine.delete()
+            return True
+        last_error = "".join(traceback.format_exception(
+            type(error), error, error.__traceback__))
+    else:
+        last_error = task_row.last_error or "Исполнитель не завершил задачу"
+    if task_row.attempts >= task_row.max_attempts:
+        mine.update(status=Task.FAILED, last_error=last_error)
+    else:
+        mine.update(
+            status=Task.PENDING,
+            run_at=timezone.now() + retry_delay(task_row.attempts),
+            last_error=last_error)
+    return False
+
+
+def work(stop, once=False, poll_interval=1.0):
+    """
+    Цикл исполнителя: берет и выполняет задачи, пока не выставлен stop.
+
+    С once=True выходит, как только готовых задач не осталось.
+    Возвращает число взятых задач.
+    """
+    done = 0
+    while not stop.is_set():
+        if not connection.in_atomic_block:
+            # Между задачами, как между запросами, закрываются соединения
+            # старше CONN_MAX_AGE и оборванные.
+            close_old_connections()
+        task_row = claim()
+        if task_row is None:
+            if once:
+                break
+            stop.wait(poll_interval)
+            continue
+        run(task_row)
+        done += 1
+    return done
+
+
+def work_in_thread(stop, once, poll_interval):
+    try:
+        return work(stop, once, poll_interval)
+    finally:
+        connection.close()
+
+
+def run_workers(concurrency, once=False, poll_interval=1.0, stop=None):
+    """
+    Запускает concurrency исполнителей и ждет их завершения.
+
+    Единственный исполнитель работает в текущем потоке, несколько —
+    в пуле потоков, каждый со своим соединением с базой. Возвращает
+    число взятых задач.
+    """
+    stop = stop or threading.Event()
+    if concurrency <= 1:
+        return work(stop, once, poll_interval)
+    with ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="tasks") as executor:
+        futures = [
+            executor.submit(work_in_thread, stop, once, poll_interval)
+            for _ in range(concurrency)]
+        try:
+            return sum(future.result() for future in futures)
+        except KeyboardInterrupt:
+            stop.set()
+            raise
@@ -0,0 +1,11 @@
+from django import template
+
+from ..pagination import page_window
+
+register = template.Library()
+
+
+@register.filter
+def page_range(page):
+    """Ограниченный набор номеров страниц вокруг текущей."""
+    return page_window(page.number, page.paginator.num_pages)
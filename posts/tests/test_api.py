@@ -0,0 +1,152 @@
+import base64
+import json
+
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..api import API_PAGE_SIZE
+from ..models import Comment, Follow, Group, Post, User
+
+
+def read_json(response):
+    if response.streaming:
+        return json.loads(b"".join(response.streaming_content))
+    return json.loads(response.content)
+
+
+class ApiTest(TestCase):
+    """Класс тестов JSON API"""
+    def setUp(self):
+        self.group = Group.objects.create(
+            title="Группа", slug="group", description="Описание")
+        self.user = User.objects.create_user(
+            username="author", password="secret")
+        self.other = User.objects.create_user(username="reader")
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.guest = Client()
+        self.posts = [
+            Post.objects.create(
+                text=f"Текст {i}", author=self.user, group=self.group)
+            for i in range(API_PAGE_SIZE + 3)
+        ]
+
+    def get(self, name, params=None, client=None, **kwargs):
+        client = client or self.guest
+        response = client.get(reverse(f"api:{name}", kwargs=kwargs), params)
+        return response.status_code, read_json(response)
+
+    def send(self, method, name, data=None, **kwargs):
+        response = getattr(self.client, method)(
+            reverse(f"api:{name}", kwargs=kwargs),
+            json.dumps(data or {}),
+            content_type="application/json")
+        content = read_json(response) if response.content else None
+        return response.status_code, content
+
+    def test_posts_cursor_pages(self):
+        """Курсоры проходят весь список публикаций."""
+        status, first = self.get("posts")
+        self.assertEqual(status, 200)
+        status, second = self.get("posts", {"cursor": first["next"]})
+        self.assertIsNone(second["next"])
+        self.assertEqual(
+            [post["id"] for post in first["results"] + second["results"]],
+            [post.pk for post in reversed(self.posts)])
+
+    def test_sparse_fieldsets(self):
+        """Параметр fields ограничивает поля ответа."""
+        _, data = self.get("posts", {"fields": "id,author", "limit": 1})
+        self.assertEqual(
+            data["results"], [{"id": self.posts[-1].pk, "author": "author"}])
+        status, data = self.get("posts", {"fields": "id,password"})
+        self.assertEqual(status, 400)
+
+    def test_list_queries_do_not_depend_on_size(self):
+        """Списки выбираются одним запросом независимо от размера."""
+        for post in self.posts[:3]:
+            Comment.objects.create(post=post, author=self.other, text="Да")
+        for name, kwargs in (
+                ("posts", {}),
+                ("groups", {}),
+                ("comments", {"post_id": self.posts[0].pk})):
+            with self.subTest(name=name):
+                with CaptureQueriesContext(connection) as captured:
+                    status, _ = self.get(name, **kwargs)
+                self.assertEqual(status, 200)
+                self.assertLessEqual(len(captured), 2)
+
+    def test_post_detail_and_counts(self):
+        """Публикация отдается с группой и числом комментариев."""
+        post = self.posts[0]
+        Comment.objects.create(post=post, author=self.other, text="Да")
+        _, data = self.get("post", post_id=post.pk)
+        self.assertEqual(data["group"], "group")
+        self.assertEqual(data["comments_count"], 1)
+        _, data = self.get("group", slug="group")
+        self.assertEqual(data["posts_count"], len(self.posts))
+        status, _ = self.get("post", post_id=0)
+        self.assertEqual(status, 404)
+
+    def test_create_edit_and_delete_post(self):
+        """Автор создает, изменяет и удаляет публикацию."""
+        status, data = self.send(
+            "post", "posts", {"text": "Новый пост", "group": "group"})
+        self.assertEqual(status, 201)
+        self.assertEqual(data["author"], "author")
+        post_id = data["id"]
+        status, data = self.send(
+            "patch", "post", {"text": "Исправлено"}, post_id=post_id)
+        self.assertEqual(status, 200)
+        self.assertEqual(data["text"], "Исправлено")
+        self.assertEqual(data["group"], "group")
+        status, _ = self.send("delete", "post", post_id=post_id)
+        self.assertEqual(status, 204)
+        self.assertFalse(Post.objects.filter(pk=post_id).exists())
+        status, data = self.send("post", "posts", {"group": "missing"})
+        self.assertEqual(status, 400)
+        self.assertIn("group", data["errors"])
+
+    def test_write_permissions(self):
+        """Гость не может писать, чужую публикацию нельзя изменить."""
+        response = self.guest.post(
+            reverse("api:posts"), json.dumps({"text": "Текст"}),
+            content_type="application/json")
+        self.assertEqual(response.status_code, 401)
+        self.client.force_login(self.other)
+        status, _ = self.send(
+            "patch", "post", {"text": "Чужое"}, post_id=self.posts[0].pk)
+        self.assertEqual(status, 403)
+
+    def test_basic_authentication(self):
+        """Мобильные клиенты авторизуются через HTTP Basic."""
+        credentials = base64.b64encode(b"author:secret").decode()
+        response = self.guest.post(
+            reverse("api:comments", kwargs={"post_id": self.posts[0].pk}),
+            json.dumps({"text": "Комментарий"}),
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Basic {credentials}")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(read_json(response)["author"], "author")
+        credentials = base64.b64encode(b"author:wrong").decode()
+        response = self.guest.get(
+            reverse("api:posts"), HTTP_AUTHORIZATION=f"Basic {credentials}")
+        self.assertEqual(response.status_code, 401)
+
+    def test_follows(self):
+        """Подписка, список подписок и отписка."""
+        self.client.force_login(self.other)
+        status, data = self.send("post", "follows", {"author": "author"})
+        self.assertEqual(status, 201)
+        _, data = self.get("follows", client=self.client)
+        self.assertEqual(
+            data["results"],
+            [{"id": data["results"][0]["id"], "user": "reader",
+              "author": "author"}])
+        status, _ = self.send("delete", "follow", username="author")
+        self.assertEqual(status, 204)
+        self.assertFalse(Follow.objects.exists())
+        status, _ = self.send("post", "follows", {"author": "reader"})
+        self.assertEqual(status, 400)
@@ -0,0 +1,23 @@
+from django.test import TestCase
+
+from .. import benchmark
+from ..management.commands.benchmark_urls import BASELINE_PATH
+
+
+class BenchmarkTest(TestCase):
+    """Класс тестов производительности страниц posts"""
+    @classmethod
+    def setUpTestData(cls):
+        benchmark.seed_dataset(
+            users=20, groups=3, posts=60, comments=100, follows=40)
+
+    def test_urls_within_baseline_queries(self):
+        """Страницы posts не делают больше запросов, чем в эталоне."""
+        results = benchmark.run(requests=2)
+        baseline = benchmark.load_baseline(BASELINE_PATH)
+        self.assertEqual(set(results), set(baseline))
+        for name, metrics in results.items():
+            with self.subTest(name=name):
+                self.assertLess(metrics["status"], 400)
+        self.assertEqual(
+            benchmark.compare(results, baseline, checks=("queries",)), [])
@@ -0,0 +1,124 @@
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from ..cache import cached_group, feed_version, invalidate_feeds
+from ..cache_backends import TwoTierCache
+from ..follow_graph import follower_ids, is_following
+from ..models import Follow, Group, User
+from ..routers import begin_request, request_wrote
+
+
+class TwoTierCacheTest(TestCase):
+    """Класс тестов двухуровневого кэша"""
+    def setUp(self):
+        self.shared = caches["shared"]
+        self.shared.clear()
+        self.cache = self.make_cache()
+
+    def make_cache(self, **options):
+        options = {"SHARED": "shared", "LOCAL_MAX_ENTRIES": 2, **options}
+        return TwoTierCache(None, {"OPTIONS": options})
+
+    def test_local_tier_serves_repeated_reads(self):
+        """Повторное чтение не обращается к общему кэшу."""
+        self.cache.set("key", {"value": 1})
+        with mock.patch.object(
+                type(self.shared), "get",
+                side_effect=AssertionError("shared cache read")):
+            self.assertEqual(self.cache.get("key"), {"value": 1})
+
+    def test_shared_value_visible_to_other_process(self):
+        """Значение, записанное одним процессом, видно другому."""
+        self.cache.set("key", "value")
+        other = self.make_cache()
+        self.assertEqual(other.get("key"), "value")
+        other.delete("key")
+        self.assertIsNone(self.make_cache().get("key"))
+
+    def test_local_entries_expire(self):
+        """Локальная копия живет не дольше LOCAL_TIMEOUT."""
+        cache = self.make_cache(LOCAL_TIMEOUT=0)
+        cache.set("key", "old")
+        self.shared.set("key", "new")
+        self.assertEqual(cache.get("key"), "new")
+
+    def test_lru_eviction(self):
+        """Локальный уровень вытесняет давно не читанные ключи."""
+        for key in ("a", "b", "c"):
+            self.cache.set(key, key)
+        self.assertEqual(list(self.cache._local), [
+            self.cache.make_key("b"), self.cache.make_key("c")])
+        self.assertEqual(self.cache.get("a"), "a")
+
+    def test_version_invalidates_keys(self):
+        """Смена версии кэша делает недействительными все ключи."""
+        self.cache.set("key", "value")
+        bumped = TwoTierCache(None, {
+            "VERSION": 2, "OPTIONS": {"SHARED": "shared"}})
+        self.assertIsNone(bumped.get("key"))
+
+    def test_cache_version_applies_to_shared_tier(self):
+        """CACHE_VERSION действует и на прямые чтения общего кэша."""
+        self.assertEqual(self.shared.version, caches["default"].version)
+
+    def test_feed_version_read_from_shared_tier(self):
+        """Сброс кэша лент сразу виден всем процессам."""
+        version = feed_version()
+        caches["default"].get("feed:version")
+        self.shared.incr("feed:version")
+        self.assertEqual(feed_version(), version + 1)
+        invalidate_feeds()
+        self.assertEqual(feed_version(), version + 2)
+
+
+@override_settings(FOLLOW_GRAPH_CHUNK_SIZE=2)
+class FollowGraphCacheTest(TestCase):
+    """Класс тестов графа подписок в кэше"""
+    def setUp(self):
+        self.shared = caches["shared"]
+        self.shared.clear()
+        self.author = User.objects.create(username="author")
+        self.followers = [
+            User.objects.create(username=f"reader{i}") for i in range(5)]
+        Follow.objects.bulk_create([
+            Follow(user=user, author=self.author) for user in self.followers])
+        self.ids = [user.pk for user in self.followers]
+
+    def test_slice_reads_only_its_chunks(self):
+        """Срез массива читает из кэша только свои куски."""
+        self.assertEqual(list(follower_ids(self.author.pk)), self.ids)
+        ids = follower_ids(self.author.pk)
+        with mock.patch.object(
+                type(self.shared), "get_many",
+                autospec=True,
+                side_effect=type(self.shared).get_many) as get_many:
+            self.assertEqual(list(ids[2:4]), self.ids[2:4])
+        [(_, keys)] = [call.args for call in get_many.call_args_list]
+        self.assertEqual(len(keys), 1)
+        self.assertEqual(len(ids), 5)
+
+    def test_lost_chunk_reloaded(self):
+        """Вытесненный кусок загружается из базы заново."""
+        follower_ids(self.author.pk)
+        self.shared.clear()
+        self.shared.set(
+            "follow:followers:%d" % self.author.pk, ("old", 2, 5, []))
+        self.assertEqual(list(follower_ids(self.author.pk)[4:]), self.ids[4:])
+
+    def test_membership_and_forget(self):
+        """Проверка подписки видит изменения Follow."""
+        reader = self.followers[0]
+        self.assertFalse(is_following(self.author, reader))
+        Follow.objects.create(user=self.author, author=reader)
+        self.assertTrue(is_following(self.author, reader))
+        self.assertTrue(is_following(self.followers[4], self.author))
+
+    def test_primary_reads_do_not_mark_request_wrote(self):
+        """Чтения из основной базы не отмечают запрос записавшим."""
+        Group.objects.create(title="Группа", slug="group")
+        begin_request()
+        follower_ids(self.author.pk)
+        cached_group("group")
+        self.assertFalse(request_wrote())
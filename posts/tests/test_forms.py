@@ -7,7 +7,9 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
-from ..models import Comment, Group, Post, User
+from ..models import Comment, Group, Post, Task, User
+from ..tasks import run_workers
+from ..thumbnails import build_thumbnail, supported_formats
 
 MEDIA_ROOT = tempfile.mkdtemp()
 
@@ -113,6 +115,52 @@ class PostCreateFormTests(TestCase):
             post, response.context.get("post"),
             "Изменения на странице поста отображаются корректно")
 
+    def test_post_thumbnail_built_in_background(self):
+        """Миниатюра строится вне запроса, до этого выводится заглушка."""
+        self.authorized_client.post(
+            reverse("new_post"),
+            data={"text": "Текст с картинкой", "image": self.uploaded})
+        post = Post.objects.get(text="Текст с картинкой")
+        self.assertFalse(post.thumbnail)
+        response = self.authorized_client.get(post.get_absolute_url())
+        self.assertContains(response, "Изображение обрабатывается")
+        self.assertEqual(
+            list(Task.objects.values_list("name", "args")),
+            [(build_thumbnail.task_name, f"[{post.pk}]")])
+        run_workers(1, once=True)
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnail.storage.exists(post.thumbnail.name))
+        response = self.authorized_client.get(post.get_absolute_url())
+        self.assertContains(response, post.thumbnail.url)
+        self.authorized_client.post(
+            reverse("post_edit", kwargs={
+                "username": self.user.username,
+                "post_id": post.id}),
+            data={"text": "Текст с картинкой", "image": SimpleUploadedFile(
+                name="other.jpeg",
+                content=self.small_jpeg,
+                content_type="image/jpeg")})
+        post.refresh_from_db()
+        self.assertFalse(post.thumbnail, "Миниатюра не сброшена.")
+
+    @override_settings(POST_IMAGE_WIDTHS=(1, 2, 480))
+    def test_post_image_variants(self):
+        """Для изображения строятся варианты, выводимые в <picture>."""
+        post = Post.objects.create(
+            text="Текст", author=self.user, image=self.uploaded)
+        build_thumbnail(post.pk)
+        variants = post.image_variants.all()
+        self.assertEqual(
+            sorted({(v.width, v.format) for v in variants}),
+            sorted((width, image_format)
+                   for width in (1, 2)
+                   for image_format in supported_formats()))
+        response = self.authorized_client.get(post.get_absolute_url())
+        for image_format in supported_formats():
+            with self.subTest(image_format=image_format):
+                self.assertContains(
+                    response, f'<source type="image/{image_format}"')
+
 
 class CommentCreateFormTests(TestCase):
     @classmethod
@@ -0,0 +1,37 @@
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..middleware import slow_requests
+from ..models import Post, User
+
+
+@override_settings(PROFILING_SERVER_TIMING=True, PROFILING_SAMPLE_RATE=1)
+class ProfilingMiddlewareTest(TestCase):
+    """Класс тестов профилирования запросов"""
+    def setUp(self):
+        self.user = User.objects.create(username="testuser", is_staff=True)
+        self.client = Client()
+        self.client.force_login(self.user)
+        Post.objects.create(text="Текст сообщения", author=self.user)
+
+    def test_server_timing_header(self):
+        """Ответ содержит заголовок Server-Timing с замерами."""
+        response = self.client.get(reverse("index"))
+        timing = response["Server-Timing"]
+        for metric in ("sql;dur=", "tpl;dur=", "cache;desc=", "total;dur="):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, timing)
+        self.assertNotIn('desc="0 queries"', timing)
+
+    def test_slow_requests_shown_in_admin(self):
+        """Медленные запросы попадают в буфер и видны в админке."""
+        url = reverse("profile", kwargs={"username": self.user.username})
+        self.client.get(url)
+        self.assertIn(url, [item["path"] for item in slow_requests()])
+        response = self.client.get(reverse("admin_profiling"))
+        self.assertContains(response, url)
+
+    def test_admin_page_requires_staff(self):
+        """Страница медленных запросов доступна только сотрудникам."""
+        response = Client().get(reverse("admin_profiling"))
+        self.assertEqual(response.status_code, 302)
@@ -1,11 +1,14 @@
 import shutil
 import tempfile
+from io import StringIO
 
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
 from django.test import TestCase, override_settings
 
-from ..models import Comment, Follow, Group, Post, User
+from ..models import AuthorStats, Comment, Follow, Group, Post, User
 
 MEDIA_ROOT = tempfile.mkdtemp()
 
@@ -122,3 +125,57 @@ class FollowModelTest(TestCase):
         expected_object_name = (f"@{self.follower.username}"
                                 f" is follower @{self.author.username}")
         self.assertEqual(expected_object_name, str(follow))
+
+    def test_follow_is_unique(self):
+        """Повторная подписка на того же автора запрещена."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=self.follower, author=self.author)
+
+
+class AuthorStatsModelTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create(username="author")
+        self.follower = User.objects.create(username="follower")
+
+    def stats(self, user):
+        return AuthorStats.objects.get(user=user)
+
+    def test_counters_follow_changes(self):
+        """Счетчики обновляются при создании и удалении объектов."""
+        post = Post.objects.create(text="Текст", author=self.author)
+        comment = Comment.objects.create(
+            post=post, author=self.follower, text="Комментарий")
+        follow = Follow.objects.create(user=self.follower, author=self.author)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.follower).following_count, 1)
+        self.assertEqual(self.stats(self.follower).comments_count, 1)
+        comment.delete()
+        follow.delete()
+        post.delete()
+        for user in (self.author, self.follower):
+            with self.subTest(user=user):
+                self.assertEqual(
+                    AuthorStats.compute(user),
+                    {name: getattr(self.stats(user), name)
+                     for name in AuthorStats.COUNTERS})
+
+    def test_for_user_reads_existing_row_once(self):
+        """Существующие счетчики читаются одним запросом, без пересчета."""
+        Post.objects.create(text="Текст", author=self.author)
+        with self.assertNumQueries(1):
+            stats = AuthorStats.objects.for_user(self.author)
+        self.assertEqual(stats.posts_count, 1)
+
+    def test_recount_command_repairs_drift(self):
+        """Команда recount_author_stats исправляет расхождения."""
+        Post.objects.create(text="Текст", author=self.author)
+        Post.objects.bulk_create(
+            [Post(text="Текст", author=self.author) for i in range(3)])
+        AuthorStats.objects.filter(user=self.follower).delete()
+        out = StringIO()
+        call_command("recount_author_stats", stdout=out)
+        self.assertEqual(self.stats(self.author).posts_count, 4)
+        self.assertEqual(self.stats(self.follower).posts_count, 0)
+        self.assertIn("Исправлено: 1", out.getvalue())
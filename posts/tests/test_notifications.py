@@ -0,0 +1,131 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.core.mail.backends.filebased import EmailBackend
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Follow, Notification, Post, Task, User
+from ..notifications import notify_followers, send_digests
+from ..tasks import run_workers
+
+EMAIL_FILE_PATH = tempfile.mkdtemp()
+
+
+@override_settings(
+    TASKS_EAGER=False,
+    EMAIL_BACKEND="django.core.mail.backends.filebased.EmailBackend",
+    EMAIL_FILE_PATH=EMAIL_FILE_PATH,
+    NOTIFY_DIGEST_DELAY=60,
+    NOTIFY_BATCH_SIZE=2,
+    NOTIFY_RATE=100)
+class NotificationTest(TestCase):
+    """Класс тестов писем подписчикам о новых публикациях"""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(EMAIL_FILE_PATH, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        for name in os.listdir(EMAIL_FILE_PATH):
+            os.remove(os.path.join(EMAIL_FILE_PATH, name))
+        self.author = User.objects.create(username="author")
+        self.other = User.objects.create(username="other")
+        self.readers = [
+            User.objects.create(
+                username=f"reader{i}", email=f"reader{i}@example.com")
+            for i in range(5)]
+        self.silent = User.objects.create(username="silent")
+        for user in self.readers + [self.silent]:
+            Follow.objects.create(user=user, author=self.author)
+        Follow.objects.create(user=self.readers[0], author=self.other)
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def sent_files(self):
+        names = sorted(os.listdir(EMAIL_FILE_PATH))
+        contents = []
+        for name in names:
+            with open(os.path.join(EMAIL_FILE_PATH, name)) as sent:
+                contents.append(sent.read())
+        return contents
+
+    def run_due_digests(self):
+        Task.objects.update(run_at=timezone.now())
+        with mock.patch("posts.notifications.time.sleep") as sleep:
+            run_workers(1, once=True)
+        return sleep
+
+    def test_new_post_only_enqueues_notification(self):
+        """Новый пост ставит рассылку в очередь и не отправляет писем."""
+        self.client.post(reverse("new_post"), data={"text": "Новый пост"})
+        post = Post.objects.get(text="Новый пост")
+        self.assertEqual(
+            list(Task.objects.values_list("name", "args")),
+            [(notify_followers.task_name, f"[{post.pk}]")])
+        self.assertEqual(self.sent_files(), [])
+
+    def test_new_post_does_not_load_follower_array(self):
+        """Проверка подписчиков не загружает их массив в кэш."""
+        caches["shared"].clear()
+        self.client.post(reverse("new_post"), data={"text": "Новый пост"})
+        self.assertIsNone(caches["shared"].get(
+            f"follow:followers:{self.author.pk}"))
+        self.assertTrue(Task.objects.exists())
+
+    def test_author_without_followers_enqueues_nothing(self):
+        """Пост автора без подписчиков не создает задач."""
+        self.client.force_login(self.silent)
+        self.client.post(reverse("new_post"), data={"text": "Тишина"})
+        self.assertFalse(Task.objects.exists())
+
+    def test_digest_groups_posts_per_recipient(self):
+        """Посты за время задержки приходят подписчику одним письмом."""
+        first = Post.objects.create(text="Первый пост", author=self.author)
+        second = Post.objects.create(text="Второй пост", author=self.other)
+        notify_followers(first.pk)
+        notify_followers(second.pk)
+        self.assertEqual(Notification.objects.count(), 6)
+        digests = Task.objects.get(name=send_digests.task_name)
+        self.assertGreater(digests.run_at, timezone.now())
+        run_workers(1, once=True)
+        self.assertEqual(self.sent_files(), [])
+        self.run_due_digests()
+        self.assertFalse(Notification.objects.exists())
+        self.assertFalse(Task.objects.exists())
+        [sent] = self.sent_files()
+        messages = sent.split("-" * 79)
+        self.assertEqual(
+            sum("To: reader" in message for message in messages), 5)
+        self.assertNotIn("silent", sent)
+        [digest] = [m for m in messages if "To: reader0@" in m]
+        self.assertIn("Первый пост", digest)
+        self.assertIn("Второй пост", digest)
+        self.assertIn(
+            f"http://localhost:8000/author/{first.pk}/", digest)
+
+    def test_batches_share_one_connection_and_are_throttled(self):
+        """Пачки писем уходят через одно соединение с паузами."""
+        post = Post.objects.create(text="Пост", author=self.author)
+        notify_followers(post.pk)
+        Task.objects.update(run_at=timezone.now())
+        close = EmailBackend.close
+        with mock.patch.object(
+                EmailBackend, "close", autospec=True,
+                side_effect=close) as closed, \
+                mock.patch("posts.notifications.time.monotonic",
+                           return_value=0), \
+                mock.patch("posts.notifications.time.sleep") as sleep:
+            run_workers(1, once=True)
+        self.assertEqual(closed.call_count, 1)
+        self.assertEqual(
+            [call.args for call in sleep.call_args_list],
+            [(0.02,), (0.04,), (0.05,)])
+        [sent] = self.sent_files()
+        self.assertEqual(sent.count("To: reader"), 5)
@@ -0,0 +1,79 @@
+from unittest import mock
+
+from django.db import connections
+from django.test import Client, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Group, Post, User
+from ..routers import PIN_COOKIE
+
+
+@mock.patch("posts.routers.replica_alias", return_value="replica")
+class ReplicaRouterTest(TransactionTestCase):
+    """Класс тестов маршрутизации чтений на реплику"""
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        self.user = User.objects.create(username="testuser")
+        self.group = Group.objects.create(
+            title="Группа", slug="group", description="Описание")
+        self.post = Post.objects.create(
+            text="Текст", author=self.user, group=self.group)
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.client.cookies.pop(PIN_COOKIE, None)
+
+    def queries(self, url):
+        """Число запросов к default и к реплике при открытии страницы."""
+        with CaptureQueriesContext(connections["default"]) as primary:
+            with CaptureQueriesContext(connections["replica"]) as replica:
+                response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(primary), len(replica)
+
+    def test_feed_views_read_from_replica(self, replica_alias):
+        """Ленты и страница поста читают с реплики."""
+        urls = (
+            reverse("index"),
+            self.group.get_absolute_url(),
+            reverse("profile", kwargs={"username": "testuser"}),
+            reverse("follow_index"),
+            self.post.get_absolute_url(),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                primary, replica = self.queries(url)
+                self.assertGreater(replica, 0)
+
+    def test_reads_pinned_to_primary_after_write(self, replica_alias):
+        """После записи пользователь читает из default."""
+        response = self.client.post(
+            reverse("new_post"), {"text": "Новый пост"})
+        self.assertIn(PIN_COOKIE, response.cookies)
+        primary, replica = self.queries(reverse("index"))
+        self.assertEqual(replica, 0)
+
+    def test_other_views_use_primary(self, replica_alias):
+        """Остальные страницы читают из default."""
+        primary, replica = self.queries(reverse("new_post"))
+        self.assertEqual(replica, 0)
+        self.assertNotIn(PIN_COOKIE, self.client.get(
+            reverse("new_post")).cookies)
+
+    def test_follow_by_get_pins_to_primary(self, replica_alias):
+        """Подписка по GET тоже закрепляет чтения за default."""
+        author = User.objects.create(username="author")
+        response = self.client.get(reverse(
+            "profile_follow", kwargs={"username": author.username}))
+        self.assertIn(PIN_COOKIE, response.cookies)
+        primary, replica = self.queries(reverse("follow_index"))
+        self.assertEqual(replica, 0)
+
+    def test_feed_reads_do_not_pin(self, replica_alias):
+        """Чтение ленты группы и подписок не ставит cookie."""
+        for url in (self.group.get_absolute_url(),
+                    reverse("profile_followers",
+                            kwargs={"username": "testuser"})):
+            with self.subTest(url=url):
+                self.assertNotIn(PIN_COOKIE, self.client.get(url).cookies)
@@ -0,0 +1,105 @@
+import shutil
+import tempfile
+from collections import Counter
+
+from django.core.files.storage import default_storage
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+
+from ..feeds import rebuild_timelines
+from ..models import (AuthorStats, Comment, Follow, Group, Post,
+                      TimelineEntry, User)
+from ..search import search_posts
+from ..seed import generate, rebuild_derived
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class SeedTest(TestCase):
+    """Класс тестов генератора синтетических данных"""
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def snapshot(self):
+        return (
+            list(Post.objects.order_by("pk").values_list(
+                "text", "author__username", "group__slug", "image")),
+            list(Comment.objects.order_by("pk").values_list(
+                "text", "post__text", "author__username")),
+            sorted(Follow.objects.values_list(
+                "user__username", "author__username")),
+        )
+
+    def test_same_seed_gives_same_data(self):
+        """Одинаковый seed дает одинаковые данные."""
+        generate(20, 3, 200, 300, 50, seed=7)
+        first = self.snapshot()
+        for model in (Comment, Follow, Post, Group, User):
+            model.objects.all().delete()
+        generate(20, 3, 200, 300, 50, seed=7)
+        self.assertEqual(self.snapshot(), first)
+
+    def test_activity_follows_power_law(self):
+        """Немногие авторы пишут большую часть постов."""
+        counts = generate(100, 5, 5000, 2000, 500, seed=1)
+        self.assertEqual(counts["posts"], 5000)
+        self.assertEqual(Comment.objects.count(), 2000)
+        posts = sorted(Counter(
+            Post.objects.values_list("author_id", flat=True)).values(),
+            reverse=True)
+        self.assertGreater(sum(posts[:10]), 5000 * 0.4)
+        self.assertFalse(Comment.objects.exclude(
+            post__in=Post.objects.all()).exists())
+        recent = Post.objects.order_by("-pub_date")[:500]
+        self.assertGreater(
+            Comment.objects.filter(post__in=recent).count(), 2000 * 0.4)
+
+    def test_images_fraction(self):
+        """Доля постов с изображением задается параметром images."""
+        generate(10, 2, 400, 0, 0, seed=3, images=0.25)
+        with_image = Post.objects.exclude(image="")
+        self.assertTrue(80 <= with_image.count() <= 120)
+        self.assertTrue(default_storage.exists(with_image.first().image.name))
+
+    def test_seed_twice_with_same_prefix(self):
+        """Повторный запуск с тем же prefix дополняет данные."""
+        outsider = User.objects.create(username="zzlater")
+        first = generate(5, 2, 20, 10, 30, seed=1, prefix="zz")
+        second = generate(5, 2, 20, 10, 30, seed=2, prefix="zz")
+        self.assertEqual((first["users"], second["users"]), (5, 5))
+        self.assertEqual(second["groups"], 2)
+        self.assertEqual(
+            User.objects.filter(username__startswith="zz").count(), 6)
+        self.assertEqual(Post.objects.count(), 40)
+        self.assertFalse(Post.objects.filter(author=outsider).exists())
+        self.assertFalse(Follow.objects.filter(author=outsider).exists())
+        self.assertFalse(Follow.objects.filter(user=outsider).exists())
+
+    def test_rebuild_derived_parts_optional(self):
+        """Ленты и поисковый индекс можно не строить."""
+        generate(20, 2, 100, 50, 60, seed=5)
+        rebuild_derived(timelines=False, search_index=False)
+        self.assertEqual(
+            AuthorStats.objects.aggregate(total=Sum("posts_count"))["total"],
+            100)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(search_posts("кот"), [])
+        rebuild_derived()
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertNotEqual(search_posts("кот"), [])
+
+    def test_timelines_rebuilt_in_batches(self):
+        """Пересборка лент пачками дает те же записи, что и целиком."""
+        generate(20, 2, 100, 0, 60, seed=5)
+        rebuild_timelines(batch_size=10 ** 6)
+        expected = set(TimelineEntry.objects.values_list(
+            "user_id", "post_id", "pub_date"))
+        rebuild_timelines(batch_size=7)
+        self.assertEqual(set(TimelineEntry.objects.values_list(
+            "user_id", "post_id", "pub_date")), expected)
+        self.assertEqual(len(expected), Follow.objects.filter(
+            author__posts__isnull=False).values_list(
+                "user_id", "author__posts").count())
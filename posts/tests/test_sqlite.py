@@ -0,0 +1,33 @@
+import os
+import tempfile
+
+from django.db import connection, connections
+from django.test import TestCase
+
+
+class SQLitePragmasTest(TestCase):
+    """Класс тестов настройки соединений SQLite"""
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_connection_pragmas(self):
+        """Новое соединение получает PRAGMA из SQLITE_PRAGMAS."""
+        self.assertEqual(self.pragma("synchronous"), 1)
+        self.assertEqual(self.pragma("busy_timeout"), 5000)
+        self.assertEqual(self.pragma("cache_size"), -64 * 1024)
+
+    def test_file_database_uses_wal(self):
+        """Файловая база переводится в журнал WAL."""
+        with tempfile.TemporaryDirectory() as directory:
+            settings_dict = dict(
+                connection.settings_dict,
+                NAME=os.path.join(directory, "db.sqlite3"))
+            wrapper = type(connections["default"])(settings_dict, "wal")
+            try:
+                with wrapper.cursor() as cursor:
+                    cursor.execute("PRAGMA journal_mode")
+                    self.assertEqual(cursor.fetchone()[0], "wal")
+            finally:
+                wrapper.close()
@@ -0,0 +1,90 @@
+import datetime
+import threading
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..models import Task
+from ..tasks import claim, enqueue, run, run_workers, task
+
+CALLS = []
+
+
+@task
+def remember(value):
+    CALLS.append(value)
+
+
+@task
+def explode(value):
+    raise RuntimeError(f"ошибка {value}")
+
+
+def not_a_task():
+    pass
+
+
+@override_settings(
+    TASKS_EAGER=False, TASK_MAX_ATTEMPTS=2, TASK_RETRY_DELAY=10)
+class TaskQueueTest(TestCase):
+    """Класс тестов очереди фоновых задач"""
+
+    def setUp(self):
+        CALLS.clear()
+
+    def test_enqueued_task_runs_and_is_deleted(self):
+        """Задача выполняется исполнителем и удаляется из очереди."""
+        enqueue(remember, 1)
+        enqueue(remember, 2)
+        self.assertEqual(CALLS, [])
+        out = StringIO()
+        call_command("run_tasks", "--once", "--concurrency=1", stdout=out)
+        self.assertEqual(CALLS, [1, 2])
+        self.assertIn("Выполнено задач: 2", out.getvalue())
+        self.assertFalse(Task.objects.exists())
+
+    def test_failed_task_is_retried_then_marked_failed(self):
+        """Упавшая задача повторяется с задержкой, затем помечается."""
+        enqueue(explode, 1)
+        self.assertFalse(run(claim()))
+        failed = Task.objects.get()
+        self.assertEqual(failed.status, Task.PENDING)
+        self.assertEqual(failed.attempts, 1)
+        self.assertIn("ошибка 1", failed.last_error)
+        self.assertGreater(failed.run_at, timezone.now())
+        self.assertIsNone(claim())
+        Task.objects.update(run_at=timezone.now())
+        self.assertFalse(run(claim()))
+        failed.refresh_from_db()
+        self.assertEqual(failed.status, Task.FAILED)
+        self.assertEqual(run_workers(1, once=True), 0)
+
+    def test_abandoned_task_is_taken_again(self):
+        """Задачу, брошенную исполнителем, забирает другой."""
+        enqueue(remember, 3)
+        first = claim()
+        self.assertIsNone(claim())
+        Task.objects.update(
+            locked_at=timezone.now() - datetime.timedelta(hours=1))
+        second = claim()
+        self.assertEqual(second.pk, first.pk)
+        self.assertNotEqual(second.locked_by, first.locked_by)
+        self.assertEqual(second.attempts, 2)
+        self.assertTrue(run(second))
+        self.assertEqual(CALLS, [3])
+        self.assertFalse(Task.objects.exists())
+
+    def test_only_marked_functions_run(self):
+        """Выполняются только функции, помеченные как задачи."""
+        Task.objects.create(
+            name=f"{__name__}.not_a_task", max_attempts=1)
+        self.assertFalse(run(claim()))
+        self.assertEqual(Task.objects.get().status, Task.FAILED)
+
+    def test_stop_event_ends_workers(self):
+        """Исполнители завершаются по событию stop."""
+        stop = threading.Event()
+        stop.set()
+        self.assertEqual(run_workers(1, stop=stop), 0)
@@ -0,0 +1,135 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from ..models import AuthorStats, Comment, Follow, Group, Post, User
+from ..transfer import Importer, export_records, import_records
+
+MEDIA_ROOT = tempfile.mkdtemp()
+SMALL_GIF = (
+    b"\x47\x49\x46\x38\x39\x61\x01\x00\x01\x00\x00\x00\x00\x21\xf9\x04"
+    b"\x01\x0a\x00\x01\x00\x2c\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02"
+    b"\x02\x4c\x01\x00\x3b"
+)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class TransferTest(TestCase):
+    """Класс тестов выгрузки и загрузки публикаций"""
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.export_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.export_dir, ignore_errors=True)
+        self.author = User.objects.create(
+            username="author", first_name="Лев", last_name="Толстой")
+        self.reader = User.objects.create(username="reader")
+        self.group = Group.objects.create(
+            title="Группа", slug="group", description="Описание")
+        self.post = Post.objects.create(
+            text="Пост с картинкой", author=self.author, group=self.group,
+            image=SimpleUploadedFile("small.gif", SMALL_GIF, "image/gif"))
+        self.plain = Post.objects.create(text="Пост", author=self.reader)
+        self.comment = Comment.objects.create(
+            post=self.post, author=self.reader, text="Комментарий")
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.dump = StringIO()
+        export_records(self.dump, self.export_dir, workers=2)
+        self.image_name = self.post.image.name
+        self.pub_date = Post.objects.get(pk=self.post.pk).pub_date
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        default_storage.delete(self.image_name)
+
+    def load(self, checkpoint=None):
+        self.dump.seek(0)
+        return import_records(
+            self.dump, checkpoint, self.export_dir, batch_size=1, workers=2)
+
+    def assert_restored(self):
+        post = Post.objects.select_related("author", "group").get(
+            text="Пост с картинкой")
+        self.assertEqual(post.pub_date, self.pub_date)
+        self.assertEqual(post.author.get_full_name(), "Лев Толстой")
+        self.assertEqual(post.group.slug, "group")
+        self.assertTrue(default_storage.exists(self.image_name))
+        self.assertEqual(
+            Comment.objects.get(text="Комментарий").post_id, post.pk)
+        self.assertTrue(Follow.objects.filter(
+            user__username="reader", author__username="author").exists())
+        self.assertEqual(
+            AuthorStats.objects.get(user__username="author").followers_count,
+            1)
+
+    def test_export_import_roundtrip(self):
+        """Выгруженные данные загружаются обратно без потерь."""
+        self.assertEqual(len(self.dump.getvalue().splitlines()), 7)
+        loaded, skipped = self.load()
+        self.assertEqual(loaded, {
+            "auth.user": 2,
+            "posts.group": 1,
+            "posts.post": 2,
+            "posts.comment": 1,
+            "posts.follow": 1,
+        })
+        self.assertEqual(skipped, {})
+        self.assert_restored()
+
+    def test_import_into_database_with_colliding_keys(self):
+        """Загрузка в базу с данными не теряет посты и не привязывает
+        комментарии к чужим постам с теми же ключами."""
+        owner = User.objects.create(username="owner")
+        Post.objects.create(
+            pk=self.post.pk, text="Чужой пост", author=owner)
+        Post.objects.create(pk=self.plain.pk, text="Еще пост", author=owner)
+        self.load()
+        self.assert_restored()
+        self.assertEqual(Post.objects.count(), 4)
+        self.assertFalse(
+            Comment.objects.filter(post__text="Чужой пост").exists())
+
+    def test_repeated_import_skips_existing_rows(self):
+        """Повторная загрузка пропускает уже загруженные записи."""
+        self.load()
+        loaded, skipped = self.load()
+        self.assertEqual(skipped, {
+            "auth.user": 2,
+            "posts.group": 1,
+            "posts.post": 2,
+            "posts.comment": 1,
+            "posts.follow": 1,
+        })
+        self.assertEqual(set(loaded.values()), {0})
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_import_resumes_from_checkpoint(self):
+        """Прерванная загрузка продолжается с контрольной точки."""
+        checkpoint = os.path.join(self.export_dir, "checkpoint")
+        load = Importer.load
+
+        def fail_on_comments(importer, model, records):
+            if model == "posts.comment":
+                raise RuntimeError("обрыв соединения")
+            return load(importer, model, records)
+
+        with mock.patch.object(Importer, "load", fail_on_comments):
+            with self.assertRaises(RuntimeError):
+                self.load(checkpoint)
+        self.assertTrue(os.path.exists(checkpoint))
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertFalse(Comment.objects.exists())
+        loaded, _ = self.load(checkpoint)
+        self.assertEqual(
+            loaded, {"posts.comment": 1, "posts.follow": 1})
+        self.assertFalse(os.path.exists(checkpoint))
+        self.assert_restored()
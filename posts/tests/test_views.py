@@ -1,14 +1,25 @@
 import shutil
 import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
 
 from django import forms
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.http import http_date
 
-from ..models import Follow, Group, Post, User
-from ..views import POSTS_PER_PAGE
+from ..models import (AuthorStats, Comment, Follow, Group, Post,
+                      TimelineEntry, User)
+from ..pagination import CursorPaginator, page_window
+from ..search import get_backend, rebuild_index
+from ..tasks import run_workers
+from ..views import COMMENTS_PER_PAGE, POSTS_PER_PAGE
 
 MEDIA_ROOT = tempfile.mkdtemp()
 
@@ -150,6 +161,7 @@ class FollowViewsTests(TestCase):
     """Класс тестов подписок"""
 
     def setUp(self):
+        cache.clear()
         self.author = User.objects.create(username="author")
         self.follower = User.objects.create(username="follower")
         self.not_follower = User.objects.create(
@@ -204,6 +216,56 @@ class FollowViewsTests(TestCase):
         self.assertIn(
             self.post, response_follow.context.get("page").object_list)
 
+    def test_follow_fills_and_prunes_timeline(self):
+        """Подписка заполняет ленту подписчика, отписка очищает ее."""
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.follower, post=self.post).exists())
+        new_post = Post.objects.create(text="Новый пост", author=self.author)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.follower, post=new_post).exists())
+        self.authorized_follower.get(reverse("profile_unfollow", kwargs={
+            "username": self.author.username}))
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.follower).exists())
+
+    @override_settings(FEED_FANOUT_FOLLOWERS_LIMIT=1)
+    def test_hybrid_author_posts_read_on_demand(self):
+        """Посты популярного автора попадают в ленту при чтении."""
+        new_post = Post.objects.create(text="Новый пост", author=self.author)
+        self.assertFalse(
+            TimelineEntry.objects.filter(post=new_post).exists())
+        response = self.authorized_follower.get(reverse("follow_index"))
+        self.assertEqual(
+            list(response.context.get("page").object_list),
+            [new_post, self.post])
+
+    @override_settings(FEED_FANOUT_FOLLOWERS_LIMIT=2, TASKS_EAGER=False)
+    def test_hybrid_posts_kept_when_author_drops_below_limit(self):
+        """Посты, написанные автором выше порога, остаются в ленте,
+        когда подписчиков становится меньше порога."""
+        Follow.objects.create(user=self.not_follower, author=self.author)
+        hybrid_post = Post.objects.create(
+            text="Пост популярного автора", author=self.author)
+        self.assertFalse(
+            TimelineEntry.objects.filter(post=hybrid_post).exists())
+        self.authorized_not_follower.get(reverse(
+            "profile_unfollow", kwargs={"username": self.author.username}))
+        follow_url = reverse("follow_index")
+        response = self.authorized_follower.get(follow_url)
+        self.assertEqual(
+            list(response.context.get("page").object_list),
+            [hybrid_post, self.post])
+        run_workers(1, once=True)
+        self.assertFalse(AuthorStats.objects.get(
+            user=self.author).fanout_skipped)
+        entry = TimelineEntry.objects.get(
+            user=self.follower, post=hybrid_post)
+        self.assertEqual(entry.pub_date, hybrid_post.pub_date)
+        response = self.authorized_follower.get(follow_url)
+        self.assertEqual(
+            list(response.context.get("page").object_list),
+            [hybrid_post, self.post])
+
     def test_not_follow_index_correct_context(self):
         """Шаблон follow_index сформирован для неподписанного пользователя
         с правильным контекстом."""
@@ -212,6 +274,51 @@ class FollowViewsTests(TestCase):
         self.assertNotIn(
             self.post, response_not_follow.context.get("page").object_list)
 
+    def test_profile_following_flag_follows_changes(self):
+        """Флаг подписки на странице автора меняется сразу после
+        подписки и отписки."""
+        url = reverse("profile", kwargs={"username": self.author.username})
+        self.assertFalse(
+            self.authorized_not_follower.get(url).context["following"])
+        self.authorized_not_follower.get(reverse(
+            "profile_follow", kwargs={"username": self.author.username}))
+        self.assertTrue(
+            self.authorized_not_follower.get(url).context["following"])
+        self.authorized_not_follower.get(reverse(
+            "profile_unfollow", kwargs={"username": self.author.username}))
+        self.assertFalse(
+            self.authorized_not_follower.get(url).context["following"])
+
+    def test_following_flag_served_from_cache(self):
+        """Повторная проверка подписки не обращается к таблице подписок."""
+        url = self.post.get_absolute_url()
+        self.authorized_follower.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_follower.get(url)
+        self.assertTrue(response.context["following"])
+        self.assertFalse(any(
+            "posts_follow" in query["sql"] for query in queries))
+
+    def test_follow_lists(self):
+        """Страницы подписчиков и подписок показывают пользователей."""
+        Follow.objects.create(user=self.not_follower, author=self.author)
+        Follow.objects.create(user=self.author, author=self.follower)
+        cases = (
+            ("profile_followers", self.author,
+             [self.follower, self.not_follower]),
+            ("profile_following", self.author, [self.follower]),
+            ("profile_following", self.not_follower, [self.author]),
+            ("profile_followers", self.not_follower, []),
+        )
+        for name, user, expected in cases:
+            with self.subTest(name=name, user=user.username):
+                response = self.authorized_follower.get(reverse(
+                    name, kwargs={"username": user.username}))
+                self.assertEqual(
+                    list(response.context["page"].object_list), expected)
+                self.assertEqual(
+                    response.context["paginator"].count, len(expected))
+
 
 class PaginatorViewsTest(TestCase):
     """Класс тестов пагинатора"""
@@ -249,3 +356,534 @@ class PaginatorViewsTest(TestCase):
                 self.assertEqual(
                     len(response.context.get('page').object_list),
                     post_nums,)
+
+    def test_page_window(self):
+        """Номера страниц ограничены краями и соседями текущей."""
+        self.assertEqual(page_window(1, 3), [1, 2, 3])
+        self.assertEqual(page_window(1, 100), [1, 2, 3, None, 100])
+        self.assertEqual(
+            page_window(50, 100), [1, None, 48, 49, 50, 51, 52, None, 100])
+        self.assertEqual(page_window(4, 100), [1, 2, 3, 4, 5, 6, None, 100])
+        self.assertEqual(page_window(100, 100), [1, None, 98, 99, 100])
+
+    @mock.patch("posts.views.POSTS_PER_PAGE", 1)
+    def test_paginator_renders_page_window(self):
+        """Пагинатор выводит ссылки только на страницы окна."""
+        cache.clear()
+        response = self.client.get(reverse("index") + "?page=7")
+        for number in (1, 5, 9, 13):
+            self.assertContains(response, f"?page={number}\"")
+        for number in (2, 4, 10, 12):
+            self.assertNotContains(response, f"?page={number}\"")
+        self.assertContains(response, "&hellip;", count=2)
+
+    @override_settings(FEED_COUNT_ESTIMATE_THRESHOLD=5)
+    def test_large_feed_count_is_estimated(self):
+        """Число постов большой ленты без фильтров оценивается без
+        COUNT(*), отфильтрованные ленты считаются точно."""
+        cases = (
+            (reverse("index"), False),
+            (self.group.get_absolute_url(), True),
+        )
+        for url, exact in cases:
+            with self.subTest(url=url):
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertEqual(
+                    response.context["paginator"].count, POSTS_PER_PAGE + 3)
+                self.assertEqual(exact, any(
+                    "COUNT(*)" in query["sql"] for query in queries))
+
+
+class CursorPaginatorViewsTest(TestCase):
+    """Класс тестов пагинации по курсору"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title="Заголовок тестовой группы",
+            description="Описание",
+            slug="test_group")
+
+    def setUp(self):
+        self.user = User.objects.create(username="testuser")
+        self.client = Client()
+        self.posts = [
+            Post.objects.create(
+                text=f"Текст сообщения {i}",
+                author=self.user,
+                group=self.group)
+            for i in range(POSTS_PER_PAGE + 3)
+        ]
+
+    def test_cursor_page_prefetches_page_rows(self):
+        """Страница по курсору — список с prefetch_related для ее строк."""
+        paginator = CursorPaginator(Post.objects.for_feed(), POSTS_PER_PAGE)
+        with self.assertNumQueries(2):
+            page = paginator.get_page(None)
+            for post in page:
+                list(post.image_variants.all())
+        self.assertIsInstance(page.object_list, list)
+        self.assertEqual(len(page), POSTS_PER_PAGE)
+        self.assertTrue(page.has_next())
+
+    def walk(self, url):
+        """Проход ленты вперед по курсорам до последней страницы."""
+        pages = []
+        response = self.client.get(url + "?cursor=")
+        while True:
+            page = response.context.get("page")
+            pages.append(page)
+            if not page.has_next():
+                return pages
+            response = self.client.get(url, {"cursor": page.next_cursor})
+
+    def test_cursor_pages_cover_feed(self):
+        """Курсоры проходят всю ленту без пропусков и повторов."""
+        urls = (
+            reverse("index"),
+            self.group.get_absolute_url(),
+            reverse("profile", kwargs={"username": self.user.username}),
+        )
+        expected = [post.pk for post in reversed(self.posts)]
+        for url in urls:
+            with self.subTest(url=url):
+                pages = self.walk(url)
+                self.assertEqual(
+                    [len(page) for page in pages], [POSTS_PER_PAGE, 3])
+                self.assertEqual(
+                    [post.pk for page in pages for post in page], expected)
+                self.assertFalse(pages[0].has_previous())
+
+    def test_cursor_previous_page(self):
+        """Ссылка назад возвращает на предыдущую страницу."""
+        url = reverse("index")
+        last_page = self.walk(url)[-1]
+        response = self.client.get(url, {"cursor": last_page.previous_cursor})
+        page = response.context.get("page")
+        self.assertEqual(
+            [post.pk for post in page],
+            [post.pk for post in reversed(self.posts)][:POSTS_PER_PAGE])
+        self.assertFalse(page.has_previous())
+        self.assertTrue(page.has_next())
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Неверный курсор открывает первую страницу."""
+        response = self.client.get(reverse("index"), {"cursor": "broken!"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.context.get("page")[0].pk, self.posts[-1].pk)
+
+    @override_settings(FEED_PAGINATION="cursor")
+    def test_page_number_fallback(self):
+        """Параметр ?page= включает пагинацию по номеру страницы."""
+        response = self.client.get(reverse("index"))
+        self.assertTrue(response.context.get("page").is_cursor)
+        response = self.client.get(reverse("index"), {"page": 2})
+        self.assertEqual(response.context.get("page").number, 2)
+        self.assertEqual(len(response.context.get("page").object_list), 3)
+
+
+class FeedQueriesTest(TestCase):
+    """Класс тестов числа запросов к базе на страницах лент"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title="Заголовок тестовой группы",
+            description="Описание",
+            slug="test_group")
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username="author")
+        self.reader = User.objects.create(username="reader")
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client = Client()
+        self.client.force_login(self.reader)
+        self.urls = (
+            reverse("index"),
+            self.group.get_absolute_url(),
+            reverse("profile", kwargs={"username": self.author.username}),
+            reverse("follow_index"),
+        )
+
+    def add_posts(self, count):
+        for i in range(count):
+            post = Post.objects.create(
+                text=f"Текст сообщения {i}",
+                author=self.author,
+                group=self.group)
+            for j in range(2):
+                Comment.objects.create(
+                    post=post, author=self.reader, text=f"Комментарий {j}")
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_feed_queries_do_not_depend_on_posts_count(self):
+        """Число запросов ленты не растет с числом постов на странице."""
+        self.add_posts(1)
+        single = {url: self.count_queries(url) for url in self.urls}
+        self.add_posts(POSTS_PER_PAGE - 1)
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), single[url])
+
+    def count_feed(self, url):
+        """Число постов ленты и был ли выполнен COUNT(*)."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        counted = any("COUNT(*)" in query["sql"] for query in queries)
+        return response.context["paginator"].count, counted
+
+    def test_feed_counts_follow_posts_without_recount(self):
+        """Число постов лент берется из кэша и меняется вместе
+        с постами без нового COUNT(*)."""
+        self.add_posts(3)
+        for url in self.urls:
+            self.assertEqual(self.count_feed(url), (3, True))
+        other_group = Group.objects.create(title="Другая", slug="other")
+        Post.objects.create(
+            text="Новый пост", author=self.author, group=self.group)
+        moved = Post.objects.filter(group=self.group).first()
+        moved.group = other_group
+        moved.save()
+        Post.objects.filter(group=self.group).last().delete()
+        for url in self.urls[:3]:
+            with self.subTest(url=url):
+                expected = 2 if url == self.group.get_absolute_url() else 3
+                self.assertEqual(self.count_feed(url), (expected, False))
+        self.assertEqual(
+            self.count_feed(other_group.get_absolute_url()), (1, True))
+
+    def test_follow_feed_counted_exactly(self):
+        """Число постов ленты подписок меняется с новыми постами
+        и подписками, страницы не обрезаются."""
+        self.add_posts(2)
+        url = reverse("follow_index")
+        self.assertEqual(self.count_feed(url), (2, True))
+        other = User.objects.create(username="other")
+        Post.objects.create(text="Пост", author=other)
+        Follow.objects.create(user=self.reader, author=other)
+        self.assertEqual(self.count_feed(url), (3, True))
+        self.add_posts(POSTS_PER_PAGE)
+        self.assertEqual(
+            self.count_feed(url), (POSTS_PER_PAGE + 3, True))
+        response = self.client.get(url, {"page": 2})
+        self.assertEqual(len(response.context["page"]), 3)
+
+    def test_group_queries_do_not_depend_on_page_size(self):
+        """Число запросов страницы группы не зависит от размера страницы."""
+        self.add_posts(12)
+        url = self.group.get_absolute_url()
+        counts = []
+        for size in (2, 12):
+            with mock.patch("posts.views.POSTS_PER_PAGE", size):
+                counts.append(self.count_queries(url))
+                response = self.client.get(url)
+                self.assertEqual(len(response.context["page"]), size)
+        self.assertEqual(counts[0], counts[1])
+
+    def test_group_served_from_cache(self):
+        """Группа берется из кэша, правка группы сбрасывает его."""
+        group = Group.objects.get(pk=self.group.pk)
+        url = group.get_absolute_url()
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertFalse(any(
+            'FROM "posts_group"' in query["sql"] for query in queries))
+        group.title = "Новое название"
+        group.save()
+        self.assertContains(self.client.get(url), "Новое название")
+        group.slug = "renamed"
+        group.save()
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(
+            self.client.get(group.get_absolute_url()).status_code, 200)
+
+    def test_feed_shows_comments_count(self):
+        """Лента выводит число комментариев к посту."""
+        self.add_posts(1)
+        for url in self.urls:
+            with self.subTest(url=url):
+                cache.clear()
+                response = self.client.get(url)
+                self.assertEqual(
+                    response.context.get("page")[0].comments_count, 2)
+                self.assertContains(response, "Комментариев: 2")
+
+
+class FeedCacheTest(TestCase):
+    """Класс тестов кэширования лент"""
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username="testuser")
+        self.other = User.objects.create(username="other")
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.post = Post.objects.create(text="Первый пост", author=self.user)
+
+    def test_new_post_and_comment_invalidate_feed(self):
+        """Новый пост и комментарий сразу видны в ленте."""
+        self.client.get(reverse("index"))
+        Post.objects.create(text="Второй пост", author=self.user)
+        response = self.client.get(reverse("index"))
+        self.assertContains(response, "Второй пост")
+        Comment.objects.create(
+            post=self.post, author=self.other, text="Комментарий")
+        response = self.client.get(reverse("index"))
+        self.assertContains(response, "Комментариев: 1")
+
+    def test_feed_cached_between_changes(self):
+        """Без изменений лента отдается из кэша."""
+        self.client.get(reverse("index"))
+        Post.objects.filter(pk=self.post.pk).update(text="Изменен в обход")
+        response = self.client.get(reverse("index"))
+        self.assertContains(response, "Первый пост")
+
+    def test_feed_cache_depends_on_viewer_and_page(self):
+        """Кэш лент различается для зрителей и страниц."""
+        url = reverse("profile", kwargs={"username": self.user.username})
+        self.client.get(url)
+        response = self.authorized_client.get(url)
+        self.assertContains(response, "Редактировать")
+        Post.objects.bulk_create(
+            [Post(text=f"Пост {i}", author=self.user)
+             for i in range(POSTS_PER_PAGE)])
+        cache.clear()
+        self.client.get(url)
+        response = self.client.get(url, {"page": 2})
+        self.assertEqual(len(response.context.get("page").object_list), 1)
+        self.assertContains(response, "Первый пост")
+
+
+class CommentsPaginationTest(TestCase):
+    """Класс тестов постраничного вывода комментариев"""
+    def setUp(self):
+        self.user = User.objects.create(username="testuser")
+        self.client = Client()
+        self.post = Post.objects.create(text="Текст", author=self.user)
+        self.comments = [
+            Comment.objects.create(
+                post=self.post, author=self.user, text=f"Комментарий {i}")
+            for i in range(COMMENTS_PER_PAGE + 3)
+        ]
+        self.url = reverse(
+            "post", kwargs={"username": "testuser", "post_id": self.post.pk})
+
+    def test_first_page_of_comments(self):
+        """На странице поста выводится первая страница комментариев."""
+        response = self.client.get(self.url)
+        self.assertEqual(
+            list(response.context.get("comments_page")),
+            self.comments[:COMMENTS_PER_PAGE])
+        next_cursor = response.context.get("comments_page").next_cursor
+        self.assertContains(response, f"?comments={next_cursor}")
+
+    def test_next_comments_fragment(self):
+        """Следующие комментарии отдаются фрагментом по курсору."""
+        response = self.client.get(self.url)
+        next_cursor = response.context.get("comments_page").next_cursor
+        response = self.client.get(
+            reverse("post_comments", kwargs={
+                "username": "testuser", "post_id": self.post.pk}),
+            {"cursor": next_cursor})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            list(response.context.get("comments_page")),
+            self.comments[COMMENTS_PER_PAGE:])
+        self.assertFalse(response.context.get("comments_page").has_next())
+        self.assertNotContains(response, "<html")
+
+
+class ConditionalGetTest(TestCase):
+    """Класс тестов условных GET-запросов"""
+    def setUp(self):
+        cache.clear()
+        self.group = Group.objects.create(
+            title="Группа", slug="group", description="Описание")
+        self.user = User.objects.create(username="testuser")
+        self.client = Client()
+        self.post = Post.objects.create(
+            text="Текст", author=self.user, group=self.group)
+        self.urls = (
+            reverse("index"),
+            self.group.get_absolute_url(),
+            reverse("profile", kwargs={"username": "testuser"}),
+            self.post.get_absolute_url(),
+        )
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+    def test_not_modified(self):
+        """Повторный запрос с валидаторами получает 304."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn("no-cache", response["Cache-Control"])
+                with self.assertNumQueries(2):
+                    response = self.revalidate(url, response)
+                self.assertEqual(response.status_code, 304)
+
+    def test_changes_invalidate_validators(self):
+        """Новый комментарий, правка поста и вход меняют валидаторы."""
+        def edit_post():
+            self.post.text = "Новый текст"
+            self.post.save()
+
+        changes = (
+            lambda: Comment.objects.create(
+                post=self.post, author=self.user, text="Комментарий"),
+            edit_post,
+            lambda: self.client.force_login(self.user),
+        )
+        for change in changes:
+            responses = [self.client.get(url) for url in self.urls]
+            change()
+            for url, response in zip(self.urls, responses):
+                with self.subTest(url=url):
+                    self.assertEqual(
+                        self.revalidate(url, response).status_code, 200)
+
+    def test_if_modified_since_alone_never_stale(self):
+        """Запрос только с If-Modified-Since не получает устаревший 304."""
+        newest = Post.objects.create(
+            text="Новый пост", author=self.user, group=self.group)
+
+        def edit_post():
+            self.post.text = "Новый текст"
+            self.post.save()
+
+        def rename_group():
+            self.group.title = "Новое название"
+            self.group.save()
+
+        changes = (
+            ("edit", edit_post),
+            ("delete newest", newest.delete),
+            ("follow", lambda: Follow.objects.create(
+                user=User.objects.create(username="reader"),
+                author=self.user)),
+            ("group", rename_group),
+            ("login", lambda: self.client.force_login(self.user)),
+            ("logout", self.client.logout),
+        )
+        since = http_date(time.time() + 60)
+        for name, change in changes:
+            for url in self.urls:
+                self.assertNotIn("Last-Modified", self.client.get(url))
+            change()
+            for url in self.urls:
+                with self.subTest(change=name, url=url):
+                    response = self.client.get(
+                        url, HTTP_IF_MODIFIED_SINCE=since)
+                    self.assertEqual(response.status_code, 200)
+
+    def backdate(self, post):
+        """Сдвигает пост раньше основного, не трогая сигналов."""
+        Post.objects.filter(pk=post.pk).update(
+            pub_date=self.post.pub_date - timedelta(days=1))
+
+    def test_unrelated_changes_keep_validators(self):
+        """Правка чужих записей не меняет валидаторы страницы."""
+        other = User.objects.create(username="other")
+        other_post = Post.objects.create(text="Чужой пост", author=other)
+        self.backdate(other_post)
+        urls = (
+            self.group.get_absolute_url(),
+            reverse("profile", kwargs={"username": "testuser"}),
+            self.post.get_absolute_url(),
+        )
+        responses = [self.client.get(url) for url in urls]
+        other_post.text = "Правка"
+        other_post.save()
+        Follow.objects.create(user=other, author=User.objects.create(
+            username="third"))
+        for url, response in zip(urls, responses):
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.revalidate(url, response).status_code, 304)
+
+    def test_deleted_post_changes_validators(self):
+        """Удаление поста меняет валидаторы страниц, где он был."""
+        older = Post.objects.create(
+            text="Старый пост", author=self.user, group=self.group)
+        self.backdate(older)
+        responses = [self.client.get(url) for url in self.urls[:3]]
+        older.delete()
+        for url, response in zip(self.urls[:3], responses):
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.revalidate(url, response).status_code, 200)
+
+
+class SearchViewsTest(TestCase):
+    """Класс тестов поиска"""
+    def setUp(self):
+        self.user = User.objects.create(username="testuser")
+        self.client = Client()
+        self.post = Post.objects.create(
+            text="Первая публикация про красивых котиков", author=self.user)
+        self.other = Post.objects.create(
+            text="Заметка о погоде", author=self.user)
+
+    def search(self, query, **params):
+        return self.client.get(reverse("search"), {"q": query, **params})
+
+    def found(self, query):
+        return list(self.search(query).context.get("page").object_list)
+
+    def test_search_finds_word_forms(self):
+        """Поиск находит посты по другим формам слов."""
+        self.assertEqual(self.found("красивый котик"), [self.post])
+        self.assertEqual(self.found("публикации"), [self.post])
+        self.assertEqual(self.found("собаки"), [])
+
+    def test_search_indexes_comments_and_deletions(self):
+        """Индекс обновляется при изменении постов и комментариев."""
+        comment = Comment.objects.create(
+            post=self.other, author=self.user, text="Будет дождливо")
+        self.assertEqual(self.found("дождливый"), [self.other])
+        comment.delete()
+        self.assertEqual(self.found("дождливый"), [])
+        self.post.text = "Совсем другой текст"
+        self.post.save()
+        self.assertEqual(self.found("котики"), [])
+        self.other.delete()
+        self.assertEqual(self.found("погода"), [])
+
+    def test_rebuild_restores_index(self):
+        """Переиндексация пачками восстанавливает пустой индекс."""
+        Comment.objects.create(
+            post=self.other, author=self.user, text="Будет дождливо")
+        get_backend().clear()
+        self.assertEqual(self.found("котики"), [])
+        rebuild_index(batch_size=1)
+        self.assertEqual(self.found("котики"), [self.post])
+        self.assertEqual(self.found("дождливый"), [self.other])
+
+    def test_search_results_ranked_and_paginated(self):
+        """Результаты упорядочены по релевантности и разбиты на страницы."""
+        for i in range(POSTS_PER_PAGE):
+            Post.objects.create(
+                text=f"Про котиков, номер {i}, и еще много других слов "
+                     f"о чем угодно, кроме главного",
+                author=self.user)
+        best = Post.objects.create(text="Котики котики", author=self.user)
+        response = self.search("котики")
+        page = response.context.get("page")
+        self.assertEqual(page[0], best)
+        self.assertEqual(len(page.object_list), POSTS_PER_PAGE)
+        self.assertContains(
+            response, "?q=%D0%BA%D0%BE%D1%82%D0%B8%D0%BA%D0%B8&amp;page=2")
+        response = self.search("котики", page=2)
+        self.assertEqual(len(response.context.get("page").object_list), 2)
@@ -0,0 +1,96 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+from sorl.thumbnail import get_thumbnail
+
+from .cache import invalidate_feeds, post_page_names, touch_pages
+from .models import Post, PostImageVariant
+from .tasks import enqueue, task
+
+THUMBNAIL_GEOMETRY = "960x339"
+THUMBNAIL_OPTIONS = {"crop": "center", "upscale": True}
+THUMBNAIL_RATIO = 339 / 960
+VARIANT_QUALITY = 80
+
+
+def supported_formats():
+    """Форматы вариантов, которые умеет сохранять установленный Pillow."""
+    Image.init()
+    return [
+        image_format for image_format in PostImageVariant.FORMATS
+        if image_format.upper() in Image.SAVE
+    ]
+
+
+def render_variant(source, width, image_format):
+    """Кадрирует изображение под ленту и кодирует его в нужный формат."""
+    size = (width, max(1, round(width * THUMBNAIL_RATIO)))
+    image = ImageOps.fit(source, size, Image.LANCZOS)
+    has_alpha = image.mode in ("RGBA", "LA") or "transparency" in image.info
+    if image_format == "jpeg" or not has_alpha:
+        image = image.convert("RGB")
+    else:
+        image = image.convert("RGBA")
+    buffer = BytesIO()
+    image.save(buffer, image_format.upper(), quality=VARIANT_QUALITY)
+    return buffer.getvalue()
+
+
+def build_variants(post):
+    """
+    Строит варианты изображения поста разной ширины и формата.
+
+    Варианты сохраняются рядом с оригиналом; ширины больше исходной
+    не строятся, кроме самой маленькой.
+    """
+    for variant in post.image_variants.all():
+        variant.image.delete(save=False)
+    post.image_variants.all().delete()
+    with post.image.open() as image_file:
+        source = Image.open(image_file)
+        source.load()
+    stem = os.path.splitext(os.path.basename(post.image.name))[0]
+    widths = sorted(settings.POST_IMAGE_WIDTHS)
+    widths = [widths[0]] + [w for w in widths[1:] if w <= source.width]
+    variants = []
+    for image_format in supported_formats():
+        for width in widths:
+            variant = PostImageVariant(
+                post=post, width=width, format=image_format)
+            variant.image.save(
+                f"{stem}-{width}.{image_format}",
+                ContentFile(render_variant(source, width, image_format)),
+                save=False)
+            variants.append(variant)
+    PostImageVariant.objects.bulk_create(variants)
+
+
+@task
+def build_thumbnail(post_id):
+    """
+    Строит миниатюру и варианты изображения поста.
+
+    Имя миниатюры записывается в Post.thumbnail, только если изображение
+    поста не сменилось за время построения.
+    """
+    post = Post.objects.filter(pk=post_id).select_related("author").only(
+        "image", "group", "author__username").first()
+    if post is None or not post.image:
+        return
+    build_variants(post)
+    thumbnail = get_thumbnail(
+        post.image, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS)
+    updated = Post.objects.filter(pk=post_id, image=post.image.name).update(
+        thumbnail=thumbnail.name)
+    if updated:
+        invalidate_feeds()
+        touch_pages(post_page_names(
+            post.pk, post.author.username, post.group_id))
+
+
+def schedule_thumbnail(post_id):
+    """Ставит построение миниатюры в очередь фоновых задач."""
+    enqueue(build_thumbnail, post_id)
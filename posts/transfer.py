@@ -0,0 +1,408 @@
+"""
+Перенос публикаций между окружениями в формате NDJSON.
+
+Каждая строка — запись вида {"model": ..., "fields": {...}}, как
+в фикстурах Django с естественными ключами: пользователи и группы
+указываются по username и slug, пост комментария — парой [username
+автора, дата публикации]. Первичные ключи не переносятся, поэтому
+загрузка в базу с данными не затирает чужие строки. Экспорт читает
+таблицы через iterator(), импорт пишет пачками bulk_create, каждая
+пачка в своей транзакции, и после каждой пачки сохраняет номер строки
+в файл контрольной точки.
+"""
+import datetime
+import json
+import logging
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from io import StringIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from .cache import invalidate_feeds, invalidate_pages, reset_counts
+from .feeds import rebuild_timelines
+from .follow_graph import forget_follows
+from .models import Comment, Follow, Group, Post, User
+from .search import rebuild_index
+
+CHUNK_SIZE = 2000
+BATCH_SIZE = 500
+COPY_WORKERS = 8
+
+USER = "auth.user"
+GROUP = "posts.group"
+POST = "posts.post"
+COMMENT = "posts.comment"
+FOLLOW = "posts.follow"
+
+EXPORTS = (
+    (USER, User.objects.all(), {
+        "username": "username",
+        "first_name": "first_name",
+        "last_name": "last_name",
+    }),
+    (GROUP, Group.objects.all(), {
+        "title": "title",
+        "slug": "slug",
+        "description": "description",
+    }),
+    (POST, Post.objects.all(), {
+        "text": "text",
+        "pub_date": "pub_date",
+        "author": "author__username",
+        "group": "group__slug",
+        "image": "image",
+    }),
+    (COMMENT, Comment.objects.all(), {
+        "post": ("post__author__username", "post__pub_date"),
+        "author": "author__username",
+        "text": "text",
+        "created": "created",
+    }),
+    (FOLLOW, Follow.objects.exclude(user=None), {
+        "user": "user__username",
+        "author": "author__username",
+    }),
+)
+
+logger = logging.getLogger(__name__)
+
+
+class TransferEncoder(DjangoJSONEncoder):
+    """Кодировщик JSON, сохраняющий даты с точностью до микросекунд."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def copy_files(pairs, workers=COPY_WORKERS):
+    """
+    Копирует файлы в пуле потоков.
+
+    pairs — итератор пар (имя файла, функция копирования). В очереди
+    одновременно не больше 2 * workers задач, поэтому память не растет
+    с числом файлов. Возвращает число скопированных файлов.
+    """
+    slots = threading.BoundedSemaphore(workers * 2)
+    copied = []
+
+    def copy(name, target):
+        try:
+            if target(name):
+                copied.append(name)
+        except OSError:
+            logger.exception("Не удалось скопировать файл %s", name)
+        finally:
+            slots.release()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for source, target in pairs:
+            slots.acquire()
+            executor.submit(copy, source, target)
+    return len(copied)
+
+
+def copy_images(names, target, workers):
+    return copy_files(((name, target) for name in names), workers)
+
+
+def export_file(media_dir):
+    """Функция копирования файла из хранилища в каталог media_dir."""
+    def target(name):
+        path = os.path.join(media_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with default_storage.open(name) as source, \
+                open(path, "wb") as destination:
+            shutil.copyfileobj(source, destination)
+        return True
+    return target
+
+
+def import_file(media_dir):
+    """Функция копирования файла из каталога media_dir в хранилище."""
+    def target(name):
+        path = os.path.join(media_dir, name)
+        if default_storage.exists(name) or not os.path.exists(path):
+            return False
+        with open(path, "rb") as source:
+            default_storage.save(name, File(source))
+        return True
+    return target
+
+
+def field_value(row, lookup):
+    """Значение поля записи; естественный ключ из нескольких полей — список."""
+    if isinstance(lookup, tuple):
+        return [row[item] for item in lookup]
+    return row[lookup]
+
+
+def export_records(stream, media_dir=None, workers=COPY_WORKERS):
+    """
+    Пишет все записи в stream построчно.
+
+    С media_dir изображения постов копируются в этот каталог параллельно
+    с выгрузкой. Возвращает число записей каждой модели.
+    """
+    counts = {}
+    images = []
+    for model, queryset, fields in EXPORTS:
+        lookups = []
+        for lookup in fields.values():
+            lookups.extend(lookup if isinstance(lookup, tuple) else [lookup])
+        rows = queryset.order_by("pk").values(*lookups)
+        counts[model] = 0
+        for row in rows.iterator(chunk_size=CHUNK_SIZE):
+            record = {"model": model, "fields": {
+                name: field_value(row, lookup)
+                for name, lookup in fields.items()}}
+            stream.write(
+                json.dumps(record, cls=TransferEncoder, ensure_ascii=False)
+                + "\n")
+            counts[model] += 1
+            if media_dir and model == POST and row["image"]:
+                images.append(row["image"])
+                if len(images) >= CHUNK_SIZE:
+                    copy_images(images, export_file(media_dir), workers)
+                    images = []
+    if media_dir:
+        copy_images(images, export_file(media_dir), workers)
+    return counts
+
+
+@contextmanager
+def keep_timestamps():
+    """Сохраняет даты из файла: auto_now_add на время импорта отключается."""
+    fields = [
+        Post._meta.get_field("pub_date"),
+        Comment._meta.get_field("created"),
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Importer:
+    """
+    Загрузка записей пачками.
+
+    Пользователи и группы ищутся по username и slug, недостающие
+    пользователи создаются без пароля. Посты получают новые первичные
+    ключи и узнаются по естественному ключу (автор, дата публикации),
+    комментарии — по (пост, автор, дата). Уже существующие строки
+    пропускаются, поэтому повторная загрузка той же пачки безопасна.
+    load возвращает число пропущенных записей пачки.
+    """
+
+    def __init__(self):
+        self.user_ids = {}
+        self.group_ids = {}
+
+    def resolve_users(self, usernames, create=True):
+        missing = {name for name in usernames if name} - set(self.user_ids)
+        if not missing:
+            return
+        if create:
+            password = make_password(None)
+            User.objects.bulk_create(
+                (User(username=name, password=password) for name in missing),
+                ignore_conflicts=True)
+        self.user_ids.update(User.objects.filter(
+            username__in=missing).values_list("username", "pk"))
+
+    def resolve_groups(self, slugs):
+        missing = {slug for slug in slugs if slug} - set(self.group_ids)
+        if missing:
+            self.group_ids.update(Group.objects.filter(
+                slug__in=missing).values_list("slug", "pk"))
+
+    def post_key(self, username, pub_date):
+        """Естественный ключ поста (ключ автора, дата) или None."""
+        author_id = self.user_ids.get(username)
+        if author_id is None:
+            return None
+        return author_id, parse_datetime(pub_date)
+
+    @staticmethod
+    def find_posts(keys):
+        """Ключи существующих постов по естественным ключам."""
+        keys = set(keys)
+        dates = {pub_date for _, pub_date in keys}
+        found = Post.objects.filter(pub_date__in=dates).values_list(
+            "author_id", "pub_date", "pk")
+        return {
+            (author_id, pub_date): pk for author_id, pub_date, pk in found
+            if (author_id, pub_date) in keys}
+
+    def load(self, model, records):
+        fields = [record["fields"] for record in records]
+        if model == USER:
+            names = [item["username"] for item in fields]
+            existing = set(User.objects.filter(
+                username__in=names).values_list("username", flat=True))
+            new = [item for item in fields if item["username"] not in existing]
+            User.objects.bulk_create(
+                (User(password=make_password(None), **item) for item in new),
+                ignore_conflicts=True)
+        elif model == GROUP:
+            existing = set(Group.objects.filter(
+                slug__in=[item["slug"] for item in fields]).values_list(
+                    "slug", flat=True))
+            new = [Group(**item) for item in fields
+                   if item["slug"] not in existing]
+            Group.objects.bulk_create(new, ignore_conflicts=True)
+        elif model == POST:
+            self.resolve_users(item["author"] for item in fields)
+            self.resolve_groups(item["group"] for item in fields)
+            seen = set(self.find_posts(
+                self.post_key(item["author"], item["pub_date"])
+                for item in fields))
+            new = []
+            for item in fields:
+                key = self.post_key(item["author"], item["pub_date"])
+                if key in seen:
+                    continue
+                seen.add(key)
+                new.append(Post(
+                    text=item["text"],
+                    pub_date=key[1],
+                    author_id=key[0],
+                    group_id=self.group_ids.get(item["group"]),
+                    image=item["image"]))
+            Post.objects.bulk_create(new)
+        elif model == COMMENT:
+            self.resolve_users(item["author"] for item in fields)
+            self.resolve_users(
+                (item["post"][0] for item in fields), create=False)
+            post_ids = self.find_posts(filter(None, (
+                self.post_key(*item["post"]) for item in fields)))
+            rows = [
+                (post_ids.get(self.post_key(*item["post"])),
+                 self.user_ids[item["author"]],
+                 parse_datetime(item["created"]),
+                 item["text"])
+                for item in fields]
+            seen = set(Comment.objects.filter(
+                post_id__in=set(post_ids.values()),
+                created__in={row[2] for row in rows},
+            ).values_list("post_id", "author_id", "created"))
+            new = []
+            for post_id, author_id, created, text in rows:
+                key = (post_id, author_id, created)
+                if post_id is None or key in seen:
+                    continue
+                seen.add(key)
+                new.append(Comment(
+                    post_id=post_id, author_id=author_id, created=created,
+                    text=text))
+            Comment.objects.bulk_create(new)
+        elif model == FOLLOW:
+            self.resolve_users(
+                name for item in fields for name in item.values())
+            pairs = {
+                (self.user_ids[item["user"]], self.user_ids[item["author"]])
+                for item in fields}
+            existing = set(Follow.objects.filter(
+                user_id__in={user_id for user_id, _ in pairs},
+                author_id__in={author_id for _, author_id in pairs},
+            ).values_list("user_id", "author_id"))
+            new = pairs - existing
+            Follow.objects.bulk_create(
+                (Follow(user_id=user_id, author_id=author_id)
+                 for user_id, author_id in new),
+                ignore_conflicts=True)
+            forget_follows(new)
+        else:
+            raise ValueError(f"Неизвестная модель: {model}")
+        return len(records) - len(new)
+
+
+def read_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path, encoding="utf-8") as checkpoint:
+        return json.load(checkpoint)["line"]
+
+
+def write_checkpoint(path, line):
+    if path:
+        with open(path, "w", encoding="utf-8") as checkpoint:
+            json.dump({"line": line}, checkpoint)
+
+
+def batches(stream, start, batch_size):
+    """
+    Пачки подряд идущих записей одной модели.
+
+    Отдает тройки (модель, записи, номер последней строки пачки);
+    строки до start пропускаются.
+    """
+    model, records, line = None, [], 0
+    for line, text in enumerate(stream, 1):
+        if line <= start or not text.strip():
+            continue
+        record = json.loads(text)
+        if records and (record["model"] != model
+                        or len(records) >= batch_size):
+            yield model, records, line - 1
+            records = []
+        model = record["model"]
+        records.append(record)
+    if records:
+        yield model, records, line
+
+
+def import_records(stream, checkpoint=None, media_dir=None,
+                   batch_size=BATCH_SIZE, workers=COPY_WORKERS):
+    """
+    Загружает записи из stream.
+
+    Номер последней загруженной строки пишется в файл checkpoint после
+    фиксации каждой пачки; повторный запуск продолжает с нее. В конце
+    пересчитываются производные таблицы: счетчики авторов, ленты
+    подписок и поисковый индекс. Возвращает два словаря с числом
+    записей каждой модели: загруженных и пропущенных — уже имеющихся
+    в базе или, для комментариев, без поста.
+    """
+    importer = Importer()
+    loaded, skipped = {}, {}
+    start = read_checkpoint(checkpoint)
+    with keep_timestamps():
+        for model, records, line in batches(stream, start, batch_size):
+            with transaction.atomic():
+                rejected = importer.load(model, records)
+            write_checkpoint(checkpoint, line)
+            loaded[model] = loaded.get(model, 0) + len(records) - rejected
+            if rejected:
+                skipped[model] = skipped.get(model, 0) + rejected
+                logger.warning(
+                    "Пропущено записей %s: %d", model, rejected)
+            if media_dir and model == POST:
+                copy_images(
+                    [item["fields"]["image"] for item in records
+                     if item["fields"]["image"]],
+                    import_file(media_dir), workers)
+    call_command("recount_author_stats", stdout=StringIO())
+    rebuild_timelines()
+    rebuild_index()
+    invalidate_feeds()
+    invalidate_pages()
+    reset_counts()
+    if checkpoint and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return loaded, skipped
@@ -1,35 +1,109 @@
+from functools import partial
+from urllib.parse import urlencode
+
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 
+from .cache import (cached_count, cached_group, conditional_page,
+                    feed_cache_context)
+from .feeds import follow_feed, follow_feed_ids
+from .follow_graph import follower_ids, following_ids, is_following
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import AuthorStats, Comment, Follow, Post, User
+from .notifications import schedule_notifications
+from .pagination import CursorPaginator, paginate, use_cursor
+from .routers import replica_reads
+from .search import search_posts
+from .thumbnails import schedule_thumbnail
 
 POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+USERS_PER_PAGE = 50
+
+
+def site_scope():
+    """Область главной страницы: все публикации и комментарии."""
+    return (
+        Post.objects.all(), Comment.objects.all(),
+        ["posts", "comments", "groups"])
+
+
+def group_scope(slug):
+    """Область страницы группы; счетчики комментариев — по всему сайту."""
+    group = cached_group(slug)
+    names = ["comments", "groups"]
+    if group is not None:
+        names.append(f"group:{group.pk}")
+    return Post.objects.filter(group__slug=slug), Comment.objects.all(), names
+
 
+def profile_scope(username):
+    """Область страницы автора; счетчики комментариев — по всему сайту."""
+    return (
+        Post.objects.filter(author__username=username),
+        Comment.objects.all(),
+        [f"author:{username}", "comments", "groups"])
 
+
+def post_scope(username, post_id):
+    """Область страницы поста: сам пост, его комментарии и автор."""
+    return (
+        Post.objects.filter(pk=post_id),
+        Comment.objects.filter(post_id=post_id),
+        [f"post:{post_id}", f"author:{username}", "groups"])
+
+
+def feed_posts(post_ids):
+    """Посты для вывода в ленте в порядке ключей post_ids."""
+    posts = Post.objects.for_feed().in_bulk(post_ids)
+    return [posts[pk] for pk in post_ids if pk in posts]
+
+
+@replica_reads
+@conditional_page(site_scope)
 def index(request):
     """view-функция для главной страницы."""
-    post_list = Post.objects.select_related("group", "author")
-    paginator = Paginator(post_list, POSTS_PER_PAGE)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
-    context = {"page": page, "paginator": paginator}
+    post_list = Post.objects.for_feed()
+    context = paginate(request, post_list, POSTS_PER_PAGE, count=partial(
+        cached_count, "posts", Post.objects.all()))
+    context.update(feed_cache_context(request, "index"))
     return render(request, "index.html", context)
 
 
+@replica_reads
+@conditional_page(group_scope)
 def group_posts(request, slug):
     """view-функция для страницы сообщества."""
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.group_posts.all()
-    paginator = Paginator(post_list, POSTS_PER_PAGE)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
-    context = {"group": group, "page": page, "paginator": paginator}
+    group = cached_group(slug)
+    if group is None:
+        raise Http404("Группа не найдена.")
+    post_list = group.group_posts.for_feed()
+    context = paginate(request, post_list, POSTS_PER_PAGE, count=partial(
+        cached_count, f"group:{group.pk}", group.group_posts.all()))
+    context.update(feed_cache_context(request, "group", group.pk))
+    context["group"] = group
     return render(request, "group.html", context)
 
 
+def search(request):
+    """view-функция поиска по постам и комментариям."""
+    query = request.GET.get("q", "").strip()
+    post_ids = search_posts(query) if query else []
+    paginator = Paginator(post_ids, POSTS_PER_PAGE)
+    page = paginator.get_page(request.GET.get("page"))
+    page.object_list = feed_posts(page.object_list)
+    context = {
+        "query": query,
+        "page": page,
+        "paginator": paginator,
+        "page_query": urlencode({"q": query}) + "&",
+    }
+    return render(request, "search.html", context)
+
+
 @login_required
 def new_post(request):
     """view-функция для создания нового поста."""
@@ -40,30 +114,27 @@ def new_post(request):
     post = form.save(commit=False)
     post.author = request.user
     post.save()
+    schedule_notifications(post)
+    if post.image:
+        schedule_thumbnail(post.pk)
     return redirect("index")
 
 
-def check_following(user, author):
-    """Проверка подписки пользователя на автора."""
-    return user.is_authenticated and Follow.objects.filter(
-        user=user,
-        author=author).exists()
-
-
+@replica_reads
+@conditional_page(profile_scope)
 def profile(request, username):
     """view-функция страницы автора."""
     author = get_object_or_404(User, username=username)
-    author_posts_list = author.posts.all()
-    paginator = Paginator(author_posts_list, POSTS_PER_PAGE)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
-    following = check_following(request.user, author)
-    context = {
+    author_posts_list = author.posts.for_feed()
+    context = paginate(
+        request, author_posts_list, POSTS_PER_PAGE, count=partial(
+            cached_count, f"author:{author.pk}", author.posts.all()))
+    context.update(feed_cache_context(request, "profile", author.pk))
+    context.update({
         "author": author,
-        "page": page,
-        "paginator": paginator,
-        "following": following,
-    }
+        "author_stats": AuthorStats.objects.for_user(author),
+        "following": is_following(request.user, author),
+    })
     return render(request, "user/profile.html", context)
 
 
@@ -87,39 +158,107 @@ def profile_unfollow(request, username):
         'profile', kwargs={'username': username})))
 
 
+def user_list_page(request, user_ids):
+    """Страница пользователей по отсортированному списку ключей."""
+    paginator = Paginator(user_ids, USERS_PER_PAGE)
+    page = paginator.get_page(request.GET.get("page"))
+    users = User.objects.in_bulk(list(page.object_list))
+    page.object_list = [
+        users[pk] for pk in page.object_list if pk in users]
+    return {"paginator": paginator, "page": page}
+
+
+@replica_reads
+def follow_list(request, username, kind):
+    """view-функция списка подписчиков или подписок автора."""
+    author = get_object_or_404(User, username=username)
+    if kind == "followers":
+        user_ids = follower_ids(author.pk)
+    else:
+        user_ids = following_ids(author.pk)
+    context = user_list_page(request, user_ids)
+    context.update({
+        "author": author,
+        "author_stats": AuthorStats.objects.for_user(author),
+        "following": is_following(request.user, author),
+        "kind": kind,
+    })
+    return render(request, "user/follow_list.html", context)
+
+
 @login_required
+@replica_reads
 def follow_index(request):
-    """view-функция для страницы подписок пользователя."""
-    post_list = Post.objects.select_related("author").filter(
-        author__following__user=request.user)
-    paginator = Paginator(post_list, POSTS_PER_PAGE)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
-    context = {
-        "page": page,
-        "paginator": paginator,
-    }
+    """
+    view-функция для страницы подписок пользователя.
+
+    Страница по номеру выбирается по ключам постов из объединения ленты
+    и постов популярных авторов, затем посты загружаются по ключам.
+    Число постов считается точно: обе части объединения считаются
+    по индексам, а кэшированный счетчик пришлось бы менять у каждого
+    подписчика при каждом новом посте.
+    """
+    if use_cursor(request):
+        context = paginate(
+            request, follow_feed(request.user).for_feed(), POSTS_PER_PAGE)
+    else:
+        post_ids = follow_feed_ids(request.user)
+        context = paginate(
+            request, post_ids, POSTS_PER_PAGE, count=post_ids.count)
+        page = context["page"]
+        page.object_list = feed_posts(
+            [post_id for post_id, _ in page.object_list])
+    context.update(feed_cache_context(request, "follow"))
     return render(request, "follow.html", context)
 
 
+def get_comments_page(post, cursor):
+    """Страница комментариев к посту, от старых к новым."""
+    paginator = CursorPaginator(
+        post.post_comments.select_related("author"),
+        COMMENTS_PER_PAGE,
+        key="created",
+        descending=False)
+    return paginator.get_page(cursor)
+
+
+@replica_reads
+@conditional_page(post_scope)
 def post_view(request, username, post_id):
     """view-функция одного поста."""
     post = get_object_or_404(
-        Post.objects.select_related("author"),
+        Post.objects.for_feed(),
         id=post_id,
         author__username=username)
     form = CommentForm(request.POST or None)
-    following = check_following(request.user, post.author)
+    following = is_following(request.user, post.author)
+    comments_page = get_comments_page(post, request.GET.get("comments"))
     context = {
         "author": post.author,
+        "author_stats": AuthorStats.objects.for_user(post.author),
         "post": post,
         "comments": post.post_comments.all(),
+        "comments_page": comments_page,
         "form": form,
         "following": following,
     }
     return render(request, "user/post.html", context)
 
 
+def post_comments(request, username, post_id):
+    """view-функция следующей страницы комментариев в виде фрагмента."""
+    post = get_object_or_404(
+        Post.objects.select_related("author").only("author__username"),
+        id=post_id,
+        author__username=username)
+    comments_page = get_comments_page(post, request.GET.get("cursor"))
+    context = {
+        "post": post,
+        "comments_page": comments_page,
+    }
+    return render(request, "user/includes/comment_list.html", context)
+
+
 @login_required
 def post_edit(request, username, post_id):
     """view-функция редактирования одного поста."""
@@ -139,7 +278,9 @@ def post_edit(request, username, post_id):
                 "is_new": False,
             }
             return render(request, "post_new.html", context)
-        form.save()
+        post = form.save()
+        if "image" in form.changed_data and post.image:
+            schedule_thumbnail(post.pk)
     return redirect("post", username=username, post_id=post_id)
 
 
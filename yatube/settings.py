@@ -37,7 +37,7 @@ ALLOWED_HOSTS = [
 INSTALLED_APPS = [
     'about',
     'users',
-    'posts',
+    'posts.apps.PostsConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -48,6 +48,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'posts.middleware.ProfilingMiddleware',
+    'posts.middleware.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,6 +59,13 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Request profiling: Server-Timing header and a buffer of the slowest
+# sampled requests shown in the admin
+
+PROFILING_SERVER_TIMING = DEBUG
+PROFILING_SAMPLE_RATE = 0.1
+PROFILING_BUFFER_SIZE = 50
+
 ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 
@@ -87,9 +96,39 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+        'CONN_MAX_AGE': 60,
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get(
+            "DATABASE_REPLICA_NAME", os.path.join(BASE_DIR, 'db.sqlite3')),
+        'CONN_MAX_AGE': 60,
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+# PRAGMAs run on every new SQLite connection (posts.sqlite). WAL lets
+# readers work alongside a writer, busy_timeout (ms) makes writers wait
+# for the lock instead of failing with "database is locked",
+# cache_size < 0 is in KiB. Compare with manage.py benchmark_writes.
+
+SQLITE_PRAGMAS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "busy_timeout": 5000,
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,
+    "temp_store": "memory",
+}
+
+# Feed views read from DATABASE_REPLICA, everything else uses default.
+# After a write the user's reads stay on default for
+# DATABASE_REPLICA_PIN_SECONDS to hide replication lag.
+
+DATABASE_ROUTERS = ['posts.routers.ReplicaRouter']
+DATABASE_REPLICA = 'replica'
+DATABASE_REPLICA_PIN_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -133,17 +172,124 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Background tasks (posts.tasks) are stored in the database and run by
+# `manage.py run_tasks`; TASKS_EAGER runs them in-process after commit instead.
+# Failed tasks are retried after TASK_RETRY_DELAY seconds, doubling each time;
+# a task held longer than TASK_LOCK_TIMEOUT seconds is taken over by another
+# worker
+
+TASKS_EAGER = False
+TASK_WORKERS = 4
+TASK_MAX_ATTEMPTS = 5
+TASK_RETRY_DELAY = 10
+TASK_LOCK_TIMEOUT = 60 * 5
+TASK_POLL_INTERVAL = 1.0
+
+# Widths of the responsive post image variants (WebP/AVIF/JPEG)
+
+POST_IMAGE_WIDTHS = (480, 960, 1440)
+
 # Login
 
 LOGIN_URL = "/auth/login/"
 LOGIN_REDIRECT_URL = "index"
 
+# Feed pagination mode: "page" (page numbers) or "cursor" (keyset on
+# pub_date, id)
+
+FEED_PAGINATION = "page"
+
+# Unfiltered feeds with at least this many rows take the page count from the
+# primary key span instead of COUNT(*); None always counts exactly
+
+FEED_COUNT_ESTIMATE_THRESHOLD = 10000
+
+# Site, group and author feed post counts are kept in the shared cache and
+# adjusted by Post signals. They expire after this many seconds and are then
+# recomputed as on a cache miss: the unfiltered site feed is estimated from
+# the primary key span once it reaches FEED_COUNT_ESTIMATE_THRESHOLD (too
+# high after deletes), group and author feeds use COUNT(*). The follow feed
+# is always counted exactly
+
+FEED_COUNT_CACHE_TIMEOUT = 60 * 10
+
+# Authors with at least this many followers are merged into follow feeds
+# on read instead of being fanned out to every follower on write
+
+FEED_FANOUT_FOLLOWERS_LIMIT = 1000
+
 EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
+# Followers are emailed about new posts (posts.notifications): posts published
+# within NOTIFY_DIGEST_DELAY seconds reach each follower as one digest, sent
+# in batches of NOTIFY_BATCH_SIZE over one connection, at most NOTIFY_RATE
+# messages per second (None disables throttling). Links start with SITE_URL
 
-CACHES = {
-    'default': {
+SITE_URL = os.environ.get("SITE_URL", "http://localhost:8000")
+NOTIFY_DIGEST_DELAY = 60 * 5
+NOTIFY_BATCH_SIZE = 100
+NOTIFY_RATE = 10
+
+
+# Full-text search: posts.search.SQLiteFTSBackend needs SQLite with FTS5,
+# posts.search.DatabaseSearchBackend works on any database
+
+SEARCH_BACKEND = "posts.search.SQLiteFTSBackend"
+SEARCH_MAX_RESULTS = 1000
+
+# Feed fragments are invalidated explicitly on Post/Comment/Group/Follow
+# changes
+
+FEED_CACHE_TIMEOUT = 60 * 5
+
+# Follow graph arrays (posts.follow_graph) are dropped on Follow changes;
+# the timeout only bounds staleness after bulk loads that skip signals.
+# Arrays are cached in chunks so a list page reads only its own ids
+
+FOLLOW_GRAPH_CACHE_TIMEOUT = 60 * 60
+FOLLOW_GRAPH_CHUNK_SIZE = 1000
+
+# Groups looked up by slug (posts.cache.cached_group) are dropped on Group
+# changes; other workers may see the old title for LOCAL_TIMEOUT seconds
+
+GROUP_CACHE_TIMEOUT = 60 * 60
+
+# Cache: a per-process LRU (posts.cache_backends.TwoTierCache) in front of
+# a store shared by all workers. CACHE_URL selects the shared store:
+# redis://host:6379/0 (needs django-redis), file:///path/to/dir, or empty
+# for an in-process stand-in. Bump CACHE_VERSION to drop every cached key;
+# it applies to both aliases, as posts.cache also reads the shared store
+# directly.
+
+CACHE_URL = os.environ.get("CACHE_URL", "")
+CACHE_VERSION = int(os.environ.get("CACHE_VERSION", 1))
+
+if CACHE_URL.startswith("redis://"):
+    SHARED_CACHE = {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': CACHE_URL,
+    }
+elif CACHE_URL.startswith("file://"):
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_URL[len("file://"):],
+    }
+else:
+    SHARED_CACHE = {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shared',
     }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'posts.cache_backends.TwoTierCache',
+        'VERSION': CACHE_VERSION,
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_MAX_ENTRIES': 1000,
+            'LOCAL_TIMEOUT': 5,
+        },
+    },
+    'shared': dict(SHARED_CACHE, VERSION=CACHE_VERSION),
 }
@@ -17,13 +17,18 @@ from django.conf.urls import handler404, handler500
 from django.contrib import admin
 from django.urls import include, path
 
+from posts.admin import profiling_view
+
 handler404 = "posts.views.page_not_found"  # noqa
 handler500 = "posts.views.server_error"  # noqa
 
 urlpatterns = [
     path("auth/", include("users.urls")),
     path("auth/", include("django.contrib.auth.urls")),
+    path("adminhost/admin/profiling/", admin.site.admin_view(profiling_view),
+         name="admin_profiling"),
     path("adminhost/admin", admin.site.urls),
     path('about/', include('about.urls', namespace='about')),
+    path("api/v1/", include("posts.api_urls", namespace="api")),
     path("", include("posts.urls")),
 ]